@@ -114,7 +114,7 @@ def detect_changes_and_overwrite(db, document_id: str, new_data: Dict, existing_
     )
     return True
 
-def update_database():
+def update_database(json_data=None):
     client = MongoClient("mongodb://localhost:27017/", serverSelectionTimeoutMS=5000)
     db = client["LucThuy_Base"]
 
@@ -122,7 +122,8 @@ def update_database():
         client.admin.command("ping")
         print("[INFO] Connected to MongoDB")
         create_indexes(db)
-        json_data = get_json_data()
+        if json_data is None:
+            json_data = get_json_data()
         print(f"[INFO] Loaded {len(json_data)} documents from Excel")
 
         col = db["tamop_thong_tin_sales_nhap"]
@@ -143,6 +144,7 @@ def update_database():
             success += 1
 
         print(f"[INFO] Done. Success: {success}, Created: {created}, Updated: {updated}")
+        return created + updated
 
     except Exception as e:
         print(f"[ERROR] {e}")
@@ -155,7 +157,7 @@ def main():
     update_database()
     while True:
         schedule.run_pending()
-        time.sleep(60)
+        time.sleep(1)
 
 if __name__ == "__main__":
     update_database()
@@ -0,0 +1,58 @@
+"""
+Đo khả năng scale theo số core của backfill.transform_body (decode + map + encode
+COPY trên process pool), không cần mạng/DB.
+
+Dữ liệu: PAGES trang get_orders dựng từ fixtures/ (như bench_transform.py),
+encode sẵn thành bytes như response thật. Chạy: python bench_backfill.py [PAGES]
+"""
+import json
+import multiprocessing
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from bench_transform import load_page
+from crawl_table_don_hang.backfill import transform_body
+from crawl_table_don_hang.processing_order import ORDER_COLUMNS
+
+PAGES = 40
+PAGE_SIZE = 1000
+
+
+def build_bodies(pages):
+    orders = load_page(PAGE_SIZE)
+    bodies = []
+    for p in range(pages):
+        for i, o in enumerate(orders):
+            o["id"] = str(100000000000000 + p * PAGE_SIZE + i)
+        bodies.append(json.dumps({"data": orders, "total_pages": pages}, ensure_ascii=False).encode("utf-8"))
+    return bodies
+
+
+def bench(workers, bodies):
+    context = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(workers, context) as pool:
+        list(pool.map(transform_body, bodies[:workers], [ORDER_COLUMNS] * workers))  # khởi động worker
+        start = time.perf_counter()
+        rows = sum(batch["count"] for batch in pool.map(transform_body, bodies, [ORDER_COLUMNS] * len(bodies)))
+        elapsed = time.perf_counter() - start
+    print(f"[BENCH] {workers} process: {rows / elapsed:>10,.0f} đơn/s ({elapsed:.2f}s cho {rows} đơn)")
+    return rows / elapsed
+
+
+def main(pages=PAGES):
+    bodies = build_bodies(pages)
+    start = time.perf_counter()
+    rows = sum(transform_body(body, ORDER_COLUMNS)["count"] for body in bodies)
+    single = rows / (time.perf_counter() - start)
+    print(f"[BENCH] {pages} trang x {PAGE_SIZE} đơn. Trong process chính: {single:,.0f} đơn/s")
+    workers = 1
+    while workers <= (os.cpu_count() or 1):
+        speed = bench(workers, bodies)
+        print(f"[BENCH]   x{speed / single:.2f} so với process chính")
+        workers *= 2
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else PAGES)
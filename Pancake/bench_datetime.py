@@ -0,0 +1,87 @@
+"""
+Đo tốc độ chuyển thời gian: to_utc_datetime cũ (isinstance + fromisoformat cho
+từng giá trị, in lỗi từng dòng) và datetimes.to_utc.
+
+Corpus theo dạng của đơn mẫu trong fixtures/: mỗi đơn có inserted_at/updated_at ISO có
+micro giây, hạn bàn giao theo ngày (phần lớn rỗng, còn lại lặp lại), shipments
+với thời gian ISO không micro giây và một ít epoch ms.
+Chạy: python bench_datetime.py [số đơn]
+"""
+import random
+import sys
+import time
+from datetime import datetime, timedelta, timezone
+
+from crawl_table_don_hang.datetimes import to_utc, report_failures
+
+ORDERS = 100000
+REPEAT = 5
+
+
+def legacy_to_utc_datetime(value):
+    """to_utc_datetime trước khi có datetimes.py (để so sánh)."""
+    if value in (None, ""):
+        return None
+    try:
+        if isinstance(value, list):
+            return legacy_to_utc_datetime(value[0]) if value else None
+        if isinstance(value, (int, float)):
+            return datetime.fromtimestamp(value / 1000, tz=timezone.utc)
+        dt = value if isinstance(value, datetime) else datetime.fromisoformat(str(value))
+        return dt.replace(tzinfo=timezone.utc) if dt.tzinfo is None else dt.astimezone(timezone.utc)
+    except Exception as e:
+        print(f"[ERROR] Không xử lý được thời gian: {value} ({type(value)}). Lỗi: {e}")
+        return None
+
+
+def build_corpus(n):
+    """Danh sách (field, value, memo) như process_orders/extract_shipments gọi."""
+    rnd = random.Random(7)
+    base = datetime(2025, 9, 17, 3, 36, 54, 712732)
+    deadlines = [(base + timedelta(days=d)).strftime("%Y-%m-%dT00:00:00") for d in range(30)]
+    corpus = []
+    for i in range(n):
+        inserted = base - timedelta(seconds=i * 37, microseconds=rnd.randrange(10 ** 6))
+        corpus.append(("inserted_at", inserted.isoformat(), False))
+        corpus.append(("updated_at", (inserted + timedelta(seconds=rnd.randrange(86400))).isoformat(), False))
+        deadline = rnd.choice(deadlines) if rnd.random() < 0.3 else None
+        corpus.append(("additional_info.delivery_deadline", deadline, True))
+        shipped = inserted.replace(microsecond=0) + timedelta(hours=2)
+        if i % 10 == 0:
+            corpus.append(("shipments.inserted_at", int(shipped.replace(tzinfo=timezone.utc).timestamp() * 1000), False))
+        else:
+            corpus.append(("shipments.inserted_at", shipped.isoformat(), False))
+    return corpus
+
+
+def bench(name, fn, corpus):
+    best = None
+    for _ in range(REPEAT):
+        start = time.perf_counter()
+        fn(corpus)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    print(f"[BENCH] {name:<22} {len(corpus) / best:>12,.0f} giá trị/s ({best * 1000:.1f} ms)")
+    return best
+
+
+def run_legacy(corpus):
+    return [legacy_to_utc_datetime(v) for _, v, _ in corpus]
+
+
+def run_engine(corpus):
+    return [to_utc(v, field, memo) for field, v, memo in corpus]
+
+
+def main(n=ORDERS):
+    corpus = build_corpus(n)
+    print(f"[BENCH] {len(corpus)} giá trị thời gian ({n} đơn), lấy kết quả tốt nhất trong {REPEAT} lần.")
+    before = bench("to_utc_datetime cũ", run_legacy, corpus)
+    after = bench("datetimes.to_utc", run_engine, corpus)
+    same = run_legacy(corpus) == run_engine(corpus)
+    print(f"[BENCH] Nhanh hơn x{before / after:.2f}. Kết quả giống nhau: {same}")
+    report_failures("[BENCH]")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else ORDERS)
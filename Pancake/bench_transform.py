@@ -0,0 +1,59 @@
+"""
+Đo tốc độ transform một trang đơn bằng process_orders.
+
+Dữ liệu: các đơn mẫu fixtures/<shop>.json của mọi shop, nhân bản thành một trang
+ROWS đơn (đổi id/thời gian/tiền để không trùng). Chạy: python bench_transform.py [ROWS]
+"""
+import copy
+import glob
+import json
+import os
+import sys
+import time
+from datetime import datetime, timedelta
+
+from crawl_table_don_hang.processing_order import process_orders
+
+ROWS = 1000
+REPEAT = 5
+
+
+def load_page(rows):
+    samples = []
+    for path in glob.glob(os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures", "*.json")):
+        with open(path, encoding="utf-8") as f:
+            samples.extend(json.load(f))
+    if not samples:
+        raise SystemExit("[ERROR] Không tìm thấy đơn mẫu nào trong fixtures/.")
+
+    base = datetime(2025, 9, 17, 3, 36, 54)
+    page = []
+    for i in range(rows):
+        o = copy.deepcopy(samples[i % len(samples)])
+        o["id"] = str(100000000000000 + i)
+        o["inserted_at"] = (base - timedelta(minutes=i)).isoformat()
+        o["updated_at"] = (base - timedelta(minutes=i, seconds=-30)).isoformat()
+        o["total_price"] = str(150000 + i * 500)
+        page.append(o)
+    return page
+
+
+def bench(name, fn, page):
+    best = None
+    for _ in range(REPEAT):
+        start = time.perf_counter()
+        fn(page)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    print(f"[BENCH] {name:<24} {len(page) / best:>12,.0f} đơn/s ({best * 1000:.1f} ms/trang)")
+    return best
+
+
+def main(rows=ROWS):
+    page = load_page(rows)
+    print(f"[BENCH] Trang {rows} đơn, lấy kết quả tốt nhất trong {REPEAT} lần.")
+    bench("process_orders", process_orders, page)
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else ROWS)
@@ -0,0 +1,35 @@
+import os
+
+#  Thông tin API Pancake dùng chung cho mọi shop
+# Đăng nhập lấy token mới (tài khoản PANCAKE_USER/PANCAKE_PASS trong .env);
+# có thể đặt sẵn một token trong PANCAKE_TOKEN
+LOGIN_URL = "https://pos.pancake.vn/api/v1/auth/login"
+# Token dùng chung giữa các lần chạy/process, làm mới trước khi hết hạn bao nhiêu giây
+TOKEN_CACHE_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), ".pancake_token.json")
+TOKEN_REFRESH_BEFORE = 30 * 60
+BASE_URL_TEMPLATE = "https://pos.pancake.vn/api/v1/shops/{shop_id}/orders/get_orders"
+
+HEADERS = {
+    "Content-Type": "application/json",
+    "Accept": "application/json",
+    "User-Agent": "Mozilla/5.0",
+    "x-client-type": "Web"
+}
+DEFAULT_PAGE_SIZE = 1000
+# Số đơn mỗi lô khi shop bật stream_parse (parse dần body của trang)
+STREAM_CHUNK_SIZE = 200
+
+# HTTP client dùng chung (crawl_table_don_hang/http_client.py)
+HTTP_MAX_RETRIES = 4            # số lần thử lại khi 429/5xx/timeout/mất kết nối
+HTTP_BACKOFF_BASE = 1.0         # giây, backoff = random(0, base * 2^lần thử)
+HTTP_BACKOFF_MAX = 30.0
+HTTP_RATE_LIMIT = 10.0          # request/giây cho tất cả shop cộng lại
+HTTP_RATE_BURST = 20
+CIRCUIT_FAILURES = 8            # số lỗi liên tiếp thì ngắt
+CIRCUIT_RESET_SECONDS = 60      # ngắt bao lâu rồi cho một request đi thử
+HTTP_HEDGE = False              # gửi request thứ hai khi request đầu chậm hơn p95
+
+# Crawl full theo cửa sổ thời gian inserted_at (crawl_table_don_hang/planner.py)
+WINDOW_MAX_ORDERS = 5000        # đơn tối đa mỗi cửa sổ (vài trang), nhiều hơn thì chia nhỏ
+WINDOW_MIN_SECONDS = 3600       # không chia cửa sổ ngắn hơn mức này
+HISTORY_START = "2015-01-01"    # mốc bắt đầu lịch sử đơn của các shop (UTC)
@@ -0,0 +1,9 @@
+# Thông tin Postgres dùng chung (mỗi shop một database, xem shops_config.py)
+PG_CONFIG = {
+    "user": "postgres",
+    "password": "truong123",
+    "host": "localhost",
+    "port": 5432,
+}
+# Số kết nối tối đa giữ trong pool cho mỗi database
+PG_POOL_MAXCONN = 4
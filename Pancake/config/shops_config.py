@@ -0,0 +1,22 @@
+# Danh sách shop Pancake do Pancake/run.py crawl. Thêm shop mới = thêm một dòng.
+# - name: tên shop (vài đơn mẫu của lượt crawl được ghi vào samples/<name>.json)
+# - max_concurrency: số trang get_orders tải song song cho shop này
+# - archive_raw (tuỳ chọn, mặc định False): lưu payload gốc vào bảng <table>_raw (JSONB, nén lz4 nếu Postgres hỗ trợ);
+#   bật cho shop đã có dữ liệu thì payload mọi đơn có đủ sau lượt crawl full kế tiếp
+# - stream_parse (tuỳ chọn, mặc định False): đọc response dạng stream và parse dần từng
+#   lô đơn (cần ijson), dùng cùng page_size lớn cho shop có danh sách items dài
+# - page_size (tuỳ chọn): ghi đè DEFAULT_PAGE_SIZE cho shop
+# - extra_columns (tuỳ chọn): cột thêm cho bảng đơn của shop, cùng dạng ORDER_COLUMNS
+#   trong processing_order.py, ví dụ ("kho", "TEXT", "warehouse_info.name", "text")
+# - interval (tuỳ chọn, mặc định SHOP_INTERVAL trong run.py): chu kỳ crawl incremental (giây)
+# - min_interval / max_interval (tuỳ chọn): giới hạn chu kỳ thích ứng (SHOP_MIN_INTERVAL / SHOP_MAX_INTERVAL)
+# - windowed (tuỳ chọn, mặc định True): crawl full theo cửa sổ thời gian song song (planner.py)
+# - hot_days (tuỳ chọn, mặc định HOT_DAYS trong tiers.py): đơn tạo trong chừng này ngày thuộc tầng hot
+# - sweep_interval (tuỳ chọn, mặc định SWEEP_INTERVAL trong run.py): chu kỳ quét id phát hiện đơn bị xoá (giây)
+SHOPS = [
+    {"name": "cua_composite_cao_cap", "shop_id": 860179986, "dbname": "don_hang_cua_composite_cao_cap", "table": "don_hang_cua_composite_cao_cap", "max_concurrency": 4},
+    {"name": "cua_composite_mien_nam", "shop_id": 1290021434, "dbname": "don_hang_cua_composite_mien_nam", "table": "don_hang_cua_composite_mien_nam", "max_concurrency": 4},
+    {"name": "luc_thuy_floor", "shop_id": 1290021436, "dbname": "don_hang_luc_thuy_floor", "table": "don_hang_luc_thuy_floor", "max_concurrency": 4},
+    {"name": "tam_op_cao_cap", "shop_id": 430030848, "dbname": "don_hang_tam_op_cao_cap", "table": "don_hang_tam_op_cao_cap", "max_concurrency": 4},
+    {"name": "van_san_cao_cap", "shop_id": 5821414, "dbname": "don_hang_van_san_cao_cap", "table": "don_hang_van_san_cao_cap", "max_concurrency": 4},
+]
@@ -0,0 +1,182 @@
+"""
+Chế độ backfill: crawl full một shop và decode + map các trang song song trên
+nhiều process (lần nạp đầu, hoặc map lại cả lịch sử sau khi đổi mapping).
+
+- Lịch sử được chia thành các cửa sổ inserted_at bằng planner.plan_windows như
+  crawl full theo cửa sổ, nên phân trang trong mỗi cửa sổ không bị xô lệch khi
+  có đơn mới chen vào giữa lượt backfill dài.
+- Thread tải tuần tự các trang của từng cửa sổ (tối đa max_concurrency request
+  cùng lúc cho cả shop); body thô (bytes) được gửi ngay sang process worker.
+- Process worker decode + process_orders + process_children rồi encode luôn thành
+  nội dung COPY text. Qua IPC chỉ có bytes vào và vài chuỗi lớn ra, không pickle
+  từng record/dict, nên chi phí IPC gần như là memcpy. Worker chỉ cần transform_body
+  (decoding/processing_order); run.py không tạo client HTTP lúc import.
+- Kết quả trả về theo thứ tự cửa sổ rồi thứ tự trang; process chính chỉ COPY (insert_copy).
+Không lọc đơn không đổi trước khi map: mọi đơn đều được map lại, merge vẫn chỉ
+ghi đè dòng có fingerprint khác.
+"""
+import multiprocessing
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+from config.pancake_config.api_params import DEFAULT_PAGE_SIZE
+from crawl_table_don_hang.crawler import fetch_page_body, parse_updated_at
+from crawl_table_don_hang.decoding import decode_page, raw_payload
+from crawl_table_don_hang.processing_order import process_orders, process_children, column_names
+from crawl_table_don_hang.planner import plan_windows, history_ranges, fmt_time
+from crawl_table_don_hang.db import copy_text
+
+# Số process map song song; mặc định bằng số core
+BACKFILL_WORKERS = None
+
+
+def transform_body(body, columns, archive_raw=False, full=False):
+    """
+    (Chạy trong process worker) body get_orders -> batch sẵn để COPY:
+    {"ids", "count", "records", "items", "shipments", "raw", "newest", "orders", "meta"}.
+    records/items/shipments/raw là COPY text; newest là updated_at lớn nhất (ISO).
+    """
+    data = decode_page(body, keep_raw=archive_raw, full=full)
+    orders = (data.get("data") or []) if isinstance(data, dict) else []
+    batch = encode_orders(orders, columns, archive_raw)
+    batch["meta"] = {k: data.get(k) for k in ("total_pages", "total_entries")} if isinstance(data, dict) else {}
+    return batch
+
+
+def encode_orders(orders, columns, archive_raw=False):
+    """Các đơn đã decode -> batch COPY text như transform_body (không có "meta"). Dùng lại cho spool.py."""
+    _, records = process_orders(orders, columns)
+    items, shipments = process_children(orders)
+
+    latest = {}
+    for o, r in zip(orders, records):
+        latest[str(r["order_id"])] = (o, r)
+    names = column_names(columns)
+    seen = [t for t in (parse_updated_at(o) for o in orders) if t is not None]
+    return {
+        "ids": list(latest),
+        "count": len(latest),
+        "records": copy_text([r.get(f) for f in names] for _, r in latest.values()),
+        "items": copy_text(items),
+        "shipments": copy_text(shipments),
+        "raw": copy_text(
+            (order_id, r["fingerprint"], raw_payload(o)) for order_id, (o, r) in latest.items()
+        ) if archive_raw else "",
+        "newest": max(seen).isoformat() if seen else None,
+        "orders": len(orders),
+    }
+
+
+def load_window(session, shop, window, page_size, http_slots, transform, retries=1):
+    """
+    (Chạy ở thread) tải tuần tự các trang của một cửa sổ (start, end, số đơn), mỗi body
+    gửi ngay sang process worker bằng transform(body) -> Future.
+    Trả về (các batch theo thứ tự trang, complete): complete khi số id lấy được khớp số
+    planner đã đếm; lệch thì tải lại cả cửa sổ một lần như planner.crawl_window.
+    """
+    start, end, expected = window
+    # Số trang biết trước từ số đã đếm: không phải chờ map xong mới tải trang sau
+    known_pages = -(-expected // page_size) if expected else 0
+    for attempt in range(retries + 1):
+        futures = []
+        page = 1
+        try:
+            while True:
+                with http_slots:
+                    body = fetch_page_body(session, shop, page, page_size, window=(start, end))
+                futures.append(transform(body))
+                if page >= known_pages and futures[-1].result()["orders"] < page_size:
+                    break
+                page += 1
+            batches = [f.result() for f in futures]
+        except RuntimeError:
+            raise
+        except Exception as e:
+            raise RuntimeError(f"Cửa sổ {fmt_time(start)} -> {fmt_time(end)}: không map được: {e}")
+        ids = set()
+        for batch in batches:
+            ids.update(batch["ids"])
+        if expected is None or len(ids) >= expected:
+            return batches, True
+        if attempt < retries:
+            print(f"[WARN] [{shop['name']}] Cửa sổ {fmt_time(start)} -> {fmt_time(end)}: lấy {len(ids)}/{expected} đơn, tải lại.")
+    return batches, False
+
+
+def iter_backfill(session, shop, columns, workers=None, page_size=None, end=None):
+    """
+    Generator: yield batch của transform_body theo thứ tự cửa sổ inserted_at rồi thứ tự trang.
+    Giá trị return là complete như iter_windows: False nếu có cửa sổ lỗi hoặc lấy thiếu đơn.
+    """
+    tag = f"[{shop['name']}]"
+    page_size = page_size or shop.get("page_size") or DEFAULT_PAGE_SIZE or 100
+    workers = max(1, workers or BACKFILL_WORKERS or os.cpu_count() or 1)
+    concurrency = max(1, shop.get("max_concurrency") or 1)
+    http_slots = threading.Semaphore(concurrency)
+    archive_raw = shop.get("archive_raw", False)
+    full = bool(shop.get("extra_columns"))
+    end = int(end or time.time())
+
+    plan_start = time.time()
+    try:
+        windows = plan_windows(session, shop, history_ranges(end), concurrency=concurrency)
+    except RuntimeError as e:
+        print(f"[ERROR] {tag} Không lập được kế hoạch backfill: {e}")
+        return False
+    print(
+        f"[PLAN] {tag} Backfill {len(windows)} cửa sổ, khoảng {sum(n or 0 for _, _, n in windows)} đơn "
+        f"(lập kế hoạch {time.time() - plan_start:.1f}s)."
+    )
+
+    # Số cửa sổ đang tải/map cùng lúc: đủ để mọi request HTTP và mọi worker luôn có việc
+    in_flight = max(2, concurrency * 2)
+    total = 0
+    complete = True
+    remaining = iter(windows)
+
+    # spawn thay vì fork: process chính đang có thread (HTTP, pipeline, các shop khác)
+    context = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(workers, context) as procs, ThreadPoolExecutor(max_workers=in_flight) as threads:
+        def transform(body):
+            return procs.submit(transform_body, body, columns, archive_raw, full)
+
+        pending = deque()
+
+        def fill():
+            while len(pending) < in_flight:
+                window = next(remaining, None)
+                if window is None:
+                    return
+                pending.append((window, threads.submit(
+                    load_window, session, shop, window, page_size, http_slots, transform
+                )))
+
+        fill()
+        try:
+            while pending:
+                (s, e, n), future = pending.popleft()
+                fill()
+                try:
+                    batches, ok = future.result()
+                except RuntimeError as err:
+                    print(f"[ERROR] {tag} {err}")
+                    complete = False
+                    break
+                complete = complete and ok
+                orders = sum(batch["orders"] for batch in batches)
+                total += orders
+                print(
+                    f"[OK] {tag} Cửa sổ {fmt_time(s)} -> {fmt_time(e)}: Map {orders}{'' if n is None else '/' + str(n)} đơn "
+                    f"({len(batches)} trang, {workers} process). Total={total}"
+                )
+                yield from batches
+        finally:
+            for _, future in pending:
+                future.cancel()
+
+    if not complete:
+        print(f"[WARN] {tag} Có cửa sổ lỗi hoặc thiếu đơn, backfill chưa trọn vẹn.")
+    return complete
@@ -0,0 +1,101 @@
+"""
+Checkpoint của lượt crawl từng shop (bảng crawl_checkpoint), để lượt bị dừng giữa
+chừng (process chết, API lỗi) chạy tiếp từ chỗ đã dừng thay vì từ trang 1.
+
+Mỗi trang được commit ngay khi ghi (insert_copy/mark_seen), checkpoint được lưu
+ngay sau đó trên cùng kết nối, nên lỗi chỉ mất tối đa một trang/cửa sổ.
+- kind "full" (crawl full theo cửa sổ, planner.py): lưu các cửa sổ đã ghi xong,
+  run_id và mốc kết thúc kế hoạch. Lượt sau chỉ crawl phần lịch sử còn lại với
+  cùng run_id, nên <table>_seen / is_deleted vẫn đúng cho cả lượt.
+- kind "incremental" (sắp theo updated_at giảm dần): lưu updated_at nhỏ nhất đã
+  ghi (low) và lúc bắt đầu lượt (started). Lượt sau chỉ crawl đơn đổi sau
+  started, rồi phần [since, low] còn dang dở.
+Checkpoint cũ hơn CHECKPOINT_MAX_AGE bị bỏ, lượt crawl làm lại từ đầu.
+"""
+import time
+from datetime import datetime, timezone
+
+from crawl_table_don_hang.db import get_checkpoint, save_checkpoint, clear_checkpoint
+
+CHECKPOINT_MAX_AGE = 24 * 60 * 60
+
+
+def to_unix(dt):
+    """datetime UTC không timezone (như updated_at/watermark) -> unix giây."""
+    return dt.replace(tzinfo=timezone.utc).timestamp()
+
+
+def from_unix(ts):
+    return datetime.fromtimestamp(ts, tz=timezone.utc).replace(tzinfo=None)
+
+
+def subtract_ranges(ranges, done):
+    """Các khoảng [(start, end)] trừ đi các khoảng đã xong."""
+    result = []
+    done = sorted(done)
+    for start, end in ranges:
+        for s, e in done:
+            if e <= start or s >= end:
+                continue
+            if s > start:
+                result.append((start, s))
+            start = max(start, e)
+            if start >= end:
+                break
+        if start < end:
+            result.append((start, end))
+    return result
+
+
+class Checkpoint:
+    def __init__(self, conn, table, kind, run_id, state):
+        self.conn = conn
+        self.table = table
+        self.kind = kind
+        self.run_id = run_id
+        self.state = state
+
+    @classmethod
+    def load(cls, conn, table, kind, now=None):
+        """Checkpoint `kind` còn hạn của bảng, None nếu không có."""
+        row = get_checkpoint(conn, table, kind)
+        if row is None:
+            return None
+        run_id, state = row
+        if (now or time.time()) - state.get("started", 0) > CHECKPOINT_MAX_AGE:
+            print(f"[CHECKPOINT] {table}: Bỏ checkpoint {kind} quá cũ, crawl lại từ đầu.")
+            clear_checkpoint(conn, table, kind)
+            return None
+        return cls(conn, table, kind, run_id, state)
+
+    @classmethod
+    def start(cls, conn, table, kind, run_id, state):
+        checkpoint = cls(conn, table, kind, run_id, state)
+        checkpoint.save()
+        return checkpoint
+
+    def save(self):
+        save_checkpoint(self.conn, self.table, self.kind, self.run_id, self.state)
+
+    def clear(self):
+        clear_checkpoint(self.conn, self.table, self.kind)
+
+    # ======= full =======
+    def window_done(self, window, seen):
+        """Cửa sổ (start, end) đã ghi xong; seen: số đơn đã thấy tới giờ trong lượt này."""
+        self.state["done"].append(list(window))
+        self.state["seen"] = self.state.get("seen_before", 0) + seen
+        self.save()
+
+    def remaining(self, ranges):
+        return subtract_ranges(ranges, [tuple(w) for w in self.state["done"]])
+
+    # ======= incremental =======
+    def page_done(self, oldest):
+        """Trang (updated_at giảm dần) đã ghi xong, oldest: updated_at nhỏ nhất của trang."""
+        if oldest is None:
+            return
+        low = self.state.get("low")
+        if low is None or oldest < datetime.fromisoformat(low):
+            self.state["low"] = oldest.isoformat()
+            self.save()
@@ -0,0 +1,291 @@
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from crawl_table_don_hang.decoding import decode_page, iter_order_chunks
+from crawl_table_don_hang.http_client import PancakeClient
+from crawl_table_don_hang.token_manager import get_token, invalidate_token
+from config.pancake_config.api_params import (
+    BASE_URL_TEMPLATE, HEADERS, DEFAULT_PAGE_SIZE, STREAM_CHUNK_SIZE
+)
+
+try:
+    from config.pancake_config.api_params import COOKIES
+except Exception:
+    COOKIES = None
+
+
+# ========== SESSION ==========
+def make_session(pool_size=10):
+    """Session keep-alive dùng chung cho mọi shop và mọi trang trong process."""
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=1, pool_maxsize=max(pool_size, 1))
+    session.mount("https://", adapter)
+    session.headers.update(HEADERS)
+    if COOKIES:
+        session.cookies.update(COOKIES)
+    return session
+
+
+def make_client(pool_size=10):
+    """PancakeClient (retry, rate limit, circuit breaker) trên một session dùng chung."""
+    return PancakeClient(make_session(pool_size), pool_size=pool_size)
+
+
+# ========== CRAWL ==========
+def build_params(page, page_size, sort_by="inserted_at", token=None, window=None):
+    """window: (start, end) unix giây, chỉ lấy đơn có sort_by trong [start, end)."""
+    params = {
+        "access_token": token or get_token(),
+        "page_size": page_size,
+        "status": -1,
+        "page": page,
+        "updateStatus": sort_by,
+        "editorId": "none",
+        "option_sort": f"{sort_by}_desc",
+        "es_only": "true"
+    }
+    if window:
+        params["startDateTime"] = window[0]
+        params["endDateTime"] = window[1] - 1  # API lấy cả hai đầu: cửa sổ liền nhau không trùng giây
+    return params
+
+
+def _post_page(session, shop, page, page_size, sort_by, stream=False, window=None):
+    url = BASE_URL_TEMPLATE.format(shop_id=shop["shop_id"])
+    for attempt in range(2):
+        try:
+            token = get_token()
+            # Sử dụng POST với body {} để match request của browser
+            resp = session.post(url, params=build_params(page, page_size, sort_by, token, window), json={}, timeout=30, stream=stream)
+        except Exception as e:
+            raise RuntimeError(f"Trang {page}: request lỗi {e}")
+        if resp.status_code != 401 or attempt:
+            break
+        # Token hết hạn/bị thu hồi giữa chừng: lấy token mới rồi thử lại một lần
+        resp.close()
+        print(f"[TOKEN] Trang {page}: HTTP 401, làm mới token và thử lại.")
+        try:
+            invalidate_token(token)
+        except Exception as e:
+            raise RuntimeError(f"Trang {page}: HTTP 401, không làm mới được token: {e}")
+
+    if resp.status_code != 200:
+        body_preview = resp.text[:1000] if resp.text else "<no body>"
+        raise RuntimeError(f"Trang {page}: HTTP {resp.status_code}. Response preview: {body_preview}")
+    return resp
+
+
+def fetch_page_body(session, shop, page, page_size, sort_by="inserted_at", window=None):
+    """Tải một trang get_orders, trả về body (bytes) chưa decode; lỗi thì raise RuntimeError."""
+    resp = _post_page(session, shop, page, page_size, sort_by, window=window)
+    try:
+        return resp.content
+    except Exception as e:
+        raise RuntimeError(f"Trang {page}: lỗi khi đọc body: {e}")
+
+
+def fetch_page(session, shop, page, page_size, sort_by="inserted_at", window=None):
+    """
+    Tải một trang get_orders. Trả về (chunks, data): chunks là các list đơn liên tiếp
+    của trang, data là metadata phân trang; lỗi thì raise RuntimeError.
+    Shop bật stream_parse: body được đọc dạng stream (gzip/br giải nén khi đọc) và
+    chunks là generator, mỗi STREAM_CHUNK_SIZE đơn parse xong được đưa đi ngay;
+    khi đó không có metadata (data = {}).
+    Shop có extra_columns: đơn được decode đầy đủ để đọc được các trường ngoài schema.
+    window: (start, end) unix giây, xem build_params.
+    """
+    stream = shop.get("stream_parse", False)
+    full = bool(shop.get("extra_columns"))
+    resp = _post_page(session, shop, page, page_size, sort_by, stream, window)
+    if stream:
+        return StreamedPage(resp, page, shop.get("archive_raw", False), full), {}
+
+    # Thông thường server trả JSON với key "data"; chỉ decode các trường mapping cần
+    try:
+        data = decode_page(resp.content, keep_raw=shop.get("archive_raw", False), full=full)
+    except Exception as e:
+        raise RuntimeError(f"Trang {page}: không parse được JSON: {e}. Raw response: {resp.text[:1000]}")
+
+    orders = data.get("data", []) if isinstance(data, dict) else []
+    return ([orders] if orders else []), data
+
+
+class StreamedPage:
+    """Các lô đơn của một trang đọc dạng stream; close() trả kết nối về pool."""
+
+    def __init__(self, resp, page, keep_raw, full=False):
+        self.resp = resp
+        self.page = page
+        self.keep_raw = keep_raw
+        self.full = full
+
+    def __iter__(self):
+        try:
+            yield from iter_order_chunks(self.resp, STREAM_CHUNK_SIZE, self.keep_raw, self.full)
+        except Exception as e:
+            raise RuntimeError(f"Trang {self.page}: lỗi khi đọc/parse stream: {e}")
+        finally:
+            self.close()
+
+    def close(self):
+        self.resp.close()
+
+
+def _close_page(future):
+    """Đóng response stream của trang đã tải nhưng không dùng tới."""
+    if future.cancelled() or future.exception() is not None:
+        return
+    chunks, _ = future.result()
+    if isinstance(chunks, StreamedPage):
+        chunks.close()
+
+
+def detect_last_page(data, page_size):
+    """Lấy số trang cuối từ metadata phân trang của response (None nếu API không trả)."""
+    if not isinstance(data, dict):
+        return None
+    total_pages = data.get("total_pages")
+    if isinstance(total_pages, int) and total_pages > 0:
+        return total_pages
+    total_entries = data.get("total_entries")
+    if isinstance(total_entries, int) and total_entries >= 0:
+        return max(1, -(-total_entries // page_size))
+    return None
+
+
+def parse_updated_at(order):
+    """updated_at của Pancake (ISO, UTC) -> datetime; None nếu thiếu/sai định dạng."""
+    try:
+        return datetime.fromisoformat(order.get("updated_at"))
+    except (TypeError, ValueError):
+        return None
+
+
+def keep_changed_since(orders, since):
+    """Lọc các đơn có updated_at >= since. Trả về (đơn giữ lại, đã chạm watermark?)."""
+    if since is None:
+        return orders, False
+    fresh = []
+    for o in orders:
+        updated_at = parse_updated_at(o)
+        if updated_at is None or updated_at >= since:
+            fresh.append(o)
+    return fresh, len(fresh) < len(orders)
+
+
+def iter_pages(session, shop, page_size=None, max_pages=None, concurrency=None, since=None, window=None, quiet=False):
+    """
+    Generator: yield từng lô đơn theo thứ tự trang, tải tối đa `concurrency` trang song song.
+    - Trang 1 tải trước để biết trang cuối (total_pages/total_entries); nếu API
+      không trả thì dò tiếp từng cửa sổ cho tới khi gặp trang rỗng/thiếu.
+    - Mỗi trang là một lô, hoặc nhiều lô nhỏ nếu shop bật stream_parse.
+    - since (datetime UTC): chế độ incremental, sắp theo updated_at và dừng khi
+      gặp đơn cũ hơn since.
+    - window: (start, end) unix giây, chỉ crawl đơn có inserted_at trong cửa sổ (planner.py).
+    - quiet: không in log từng trang.
+    Giá trị return (StopIteration.value) là complete; complete=False nếu crawl
+    dừng giữa chừng vì lỗi hoặc max_pages.
+    """
+    tag = f"[{shop['name']}]"
+    page_size = page_size or shop.get("page_size") or DEFAULT_PAGE_SIZE or 100  # nếu config để None thì dùng 100
+    concurrency = max(1, concurrency or shop.get("max_concurrency") or 1)
+    sort_by = "updated_at" if since else "inserted_at"
+    total = 0
+    complete = False
+    last_page = None
+    capped = False
+
+    pending = deque()  # (page, future) theo đúng thứ tự trang
+    next_page = 2
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        # Trang 1 đi trước, các trang sau chỉ được xếp hàng khi đã biết metadata
+        pending.append((1, pool.submit(fetch_page, session, shop, 1, page_size, sort_by, window)))
+        ready = False
+        try:
+            while True:
+                while ready and len(pending) < concurrency and (last_page is None or next_page <= last_page):
+                    pending.append((next_page, pool.submit(fetch_page, session, shop, next_page, page_size, sort_by, window)))
+                    next_page += 1
+                if not pending:
+                    if capped:
+                        print(f"{tag} Đạt giới hạn max_pages={max_pages}. Dừng.")
+                    else:
+                        complete = True
+                    break
+
+                page, future = pending.popleft()
+                count = kept = 0
+                reached = False
+                try:
+                    chunks, data = future.result()
+                    if page == 1:
+                        last_page = detect_last_page(data, page_size)
+                        capped = bool(max_pages) and (last_page is None or last_page > max_pages)
+                        if capped:
+                            last_page = max_pages
+                    for chunk in chunks:
+                        count += len(chunk)
+                        fresh, reached = keep_changed_since(chunk, since)
+                        kept += len(fresh)
+                        total += len(fresh)
+                        if fresh:
+                            yield fresh
+                        if reached:
+                            break
+                    if isinstance(chunks, StreamedPage):
+                        chunks.close()
+                except RuntimeError as e:
+                    print(f"[ERROR] {tag} {e}")
+                    break
+
+                if not count:
+                    if not quiet:
+                        print(f"==> {tag} Đã đến trang cuối (API trả về rỗng).")
+                    complete = True
+                    break
+
+                if not quiet:
+                    print(f"[OK] {tag} Trang {page}: Lấy {kept} đơn hàng (page_size={page_size}). Total={total}")
+                if reached:
+                    print(f"==> {tag} Đã chạm watermark {since}. Dừng crawl.")
+                    complete = True
+                    break
+
+                # Dừng nếu trang trả về ít hơn page_size (trang cuối)
+                if count < page_size:
+                    if not quiet:
+                        print(f"==> {tag} Trang cuối (số item < page_size). Dừng crawl.")
+                    complete = True
+                    break
+                ready = True
+        finally:
+            # Bỏ các trang đã xếp hàng nhưng không còn cần
+            for _, future in pending:
+                if not future.cancel():
+                    future.add_done_callback(_close_page)
+
+    return complete
+
+
+def crawl_batches(session, shop, page_size=None, max_pages=None, concurrency=None, since=None, window=None, quiet=False):
+    """Gom toàn bộ trang của iter_pages vào một list. Trả về (orders, complete)."""
+    all_orders = []
+    pages = iter_pages(session, shop, page_size, max_pages, concurrency, since, window, quiet)
+    while True:
+        try:
+            all_orders.extend(next(pages))
+        except StopIteration as stop:
+            return all_orders, stop.value
+
+
+def chain_pages(*sources):
+    """Nối nhiều generator trang (iter_pages/iter_windows) thành một; dừng ở nguồn đầu tiên chưa trọn vẹn."""
+    for source in sources:
+        complete = yield from source
+        if not complete:
+            return False
+    return True
@@ -0,0 +1,148 @@
+"""
+Chuyển thời gian của Pancake về datetime UTC (ghi thẳng vào cột TIMESTAMPTZ).
+
+- Dạng phổ biến "YYYY-MM-DDTHH:MM:SS[.ffffff]" (UTC, không timezone) được nhận
+  ra bằng độ dài + ký tự phân cách rồi parse luôn, không dò định dạng.
+- Các dạng khác (ISO có timezone, "YYYY/MM/DD HH:MM:SS" giờ VN, epoch ms,
+  serial Excel, list) được dò một lần rồi nhớ theo trường nguồn (field); giá trị
+  sau của cùng trường đi thẳng vào hàm parse đã nhớ.
+- memo=True: nhớ kết quả theo giá trị, cho các trường lặp lại nhiều (hạn bàn giao theo ngày).
+- Giá trị không đọc được không in ra từng dòng mà được đếm theo trường,
+  report_failures() in gộp một lần.
+"""
+import threading
+from collections import Counter
+from datetime import datetime, timedelta, timezone
+
+UTC = timezone.utc
+VN_TZ = timezone(timedelta(hours=7))
+EXCEL_EPOCH = datetime(1899, 12, 30, tzinfo=UTC)
+# Số nhỏ hơn mức này là serial Excel (ngày), lớn hơn là epoch milliseconds
+EXCEL_SERIAL_MAX = 100000
+MEMO_SIZE = 4096
+
+failures = Counter()
+_failure_samples = {}
+_failures_lock = threading.Lock()
+_formats = {}  # field -> dạng đã gặp
+_memos = {}    # field -> {giá trị: datetime}
+_MISS = object()
+_fromisoformat = datetime.fromisoformat
+
+
+# ======= Parser theo dạng =======
+def _is_iso(value):
+    return type(value) is str and len(value) >= 10 and value[4] == "-" and value[7] == "-"
+
+
+def _parse_iso(value):
+    dt = datetime.fromisoformat(value[:-1] + "+00:00" if value.endswith("Z") else value)
+    return dt.replace(tzinfo=UTC) if dt.tzinfo is None else dt.astimezone(UTC)
+
+
+def _is_vn(value):
+    return type(value) is str and len(value) == 19 and value[4] == "/"
+
+
+def _parse_vn(value):
+    return datetime.strptime(value, "%Y/%m/%d %H:%M:%S").replace(tzinfo=VN_TZ).astimezone(UTC)
+
+
+def _is_number(value):
+    return isinstance(value, (int, float)) and not isinstance(value, bool)
+
+
+def _parse_number(value):
+    if value < EXCEL_SERIAL_MAX:
+        return EXCEL_EPOCH + timedelta(days=value)
+    return datetime.fromtimestamp(value / 1000, tz=UTC)
+
+
+def _parse_datetime(value):
+    return value.replace(tzinfo=UTC) if value.tzinfo is None else value.astimezone(UTC)
+
+
+def _parse_list(value):
+    return to_utc(value[0]) if value else None
+
+
+# (nhận dạng, parse) theo thứ tự dò
+_FORMATS = [
+    (_is_iso, _parse_iso),
+    (_is_vn, _parse_vn),
+    (_is_number, _parse_number),
+    (lambda v: isinstance(v, datetime), _parse_datetime),
+    (lambda v: isinstance(v, list), _parse_list),
+]
+
+
+def _detect(value):
+    """Dạng của một giá trị thời gian -> (nhận dạng, parse); None nếu không nhận ra."""
+    for fmt in _FORMATS:
+        if fmt[0](value):
+            return fmt
+    return None
+
+
+# ======= API =======
+def to_utc(value, field=None, memo=False):
+    """
+    Thời gian của Pancake -> datetime có tzinfo UTC; None nếu rỗng hoặc không đọc được.
+    field: tên trường nguồn để nhớ định dạng và đếm lỗi theo trường.
+    """
+    if value is None or value == "":
+        return None
+    if memo and type(value) is str:
+        cache = _memos.get(field)
+        if cache is None:
+            cache = _memos.setdefault(field, {})
+        dt = cache.get(value, _MISS)
+        if dt is _MISS:
+            if len(cache) >= MEMO_SIZE:
+                cache.clear()
+            dt = cache[value] = _convert(value, field)
+        return dt
+    return _convert(value, field)
+
+
+def _convert(value, field):
+    # Dạng phổ biến: "2025-09-17T03:36:54" / "2025-09-17T03:36:54.712732", UTC.
+    # Ghép offset vào chuỗi rẻ hơn nhiều so với parse rồi .replace(tzinfo=...)
+    if type(value) is str and (len(value) == 26 or len(value) == 19) and value[10] == "T" and value[4] == "-":
+        try:
+            return _fromisoformat(value + "+00:00")
+        except ValueError:
+            _fail(field, value)
+            return None
+
+    fmt = _formats.get(field)
+    if fmt is None or not fmt[0](value):
+        fmt = _detect(value)
+        if fmt is None:
+            _fail(field, value)
+            return None
+        _formats[field] = fmt
+    try:
+        return fmt[1](value)
+    except (ValueError, TypeError, OverflowError, OSError, IndexError):
+        _fail(field, value)
+        return None
+
+
+def _fail(field, value):
+    with _failures_lock:
+        failures[field] += 1
+        _failure_samples[field] = value
+
+
+def report_failures(tag=""):
+    """In gộp số giá trị thời gian không đọc được theo trường rồi reset. Trả về dict đếm."""
+    with _failures_lock:
+        counts = dict(failures)
+        samples = dict(_failure_samples)
+        failures.clear()
+        _failure_samples.clear()
+    if counts:
+        detail = ", ".join(f"{f or '?'}={n} (vd: {samples[f]!r:.60})" for f, n in counts.items())
+        print(f"[WARN] {tag} Không xử lý được thời gian: {detail}".replace("  ", " "))
+    return counts
@@ -0,0 +1,581 @@
+import io
+import json
+import threading
+from contextlib import contextmanager
+
+from psycopg2.pool import ThreadedConnectionPool
+
+from config.pg_config.pg_connection import PG_CONFIG, PG_POOL_MAXCONN
+from crawl_table_don_hang.processing_order import (
+    ORDER_COLUMNS, fields, item_fields, shipment_fields, safe_value
+)
+
+# Tỉ lệ tối đa số đơn được đánh dấu xoá trong một lượt crawl full
+MAX_DELETE_RATIO = 0.2
+
+# Một pool cho mỗi database, dùng chung cho mọi shop trong cùng process
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+# ========== POOL ==========
+def get_pool(dbname):
+    with _pools_lock:
+        pool = _pools.get(dbname)
+        if pool is None:
+            pool = ThreadedConnectionPool(1, PG_POOL_MAXCONN, dbname=dbname, **PG_CONFIG)
+            _pools[dbname] = pool
+            print(f"[DB] Tạo pool kết nối cho {dbname}.")
+    return pool
+
+
+@contextmanager
+def connection(dbname):
+    """Mượn một kết nối từ pool; rollback nếu lỗi và luôn trả kết nối về pool."""
+    pool = get_pool(dbname)
+    conn = pool.getconn()
+    try:
+        yield conn
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        pool.putconn(conn)
+
+
+def close_pools():
+    with _pools_lock:
+        for pool in _pools.values():
+            pool.closeall()
+        _pools.clear()
+
+
+# ========== DON HANG ==========
+def create_table(conn, table, columns=ORDER_COLUMNS):
+    """Bảng đơn theo khai báo cột (ORDER_COLUMNS + extra_columns); cột mới được ADD nếu bảng đã có."""
+    definitions = ",\n        ".join(f"{name} {sql_type}" for name, sql_type, *_ in columns)
+    added = "\n    ".join(
+        f"ALTER TABLE {table} ADD COLUMN IF NOT EXISTS {name} {sql_type};"
+        for name, sql_type, *_ in columns if "PRIMARY KEY" not in sql_type
+    )
+    sql = f"""
+    CREATE TABLE IF NOT EXISTS {table}(
+        {definitions},
+        fingerprint TEXT,
+        is_deleted BOOLEAN DEFAULT FALSE
+    );
+    {added}
+    ALTER TABLE {table} ADD COLUMN IF NOT EXISTS fingerprint TEXT;
+    CREATE INDEX IF NOT EXISTS {table}_tao_luc_idx ON {table} (tao_luc);
+    CREATE UNLOGGED TABLE IF NOT EXISTS {table}_seen(
+        run_id BIGINT,
+        order_id TEXT
+    );
+    CREATE INDEX IF NOT EXISTS {table}_seen_idx ON {table}_seen (run_id, order_id);
+    """
+    with conn.cursor() as cur:
+        cur.execute(sql)
+        conn.commit()
+    print(f"[DB] Bảng {table} đã sẵn sàng.")
+
+
+def create_child_tables(conn, table):
+    """Bảng con {table}_items và {table}_shipments, khoá theo order_id."""
+    sql = f"""
+    CREATE TABLE IF NOT EXISTS {table}_items(
+        order_id TEXT NOT NULL,
+        item_index INTEGER NOT NULL,
+        item_id TEXT,
+        product_id TEXT,
+        variation_id TEXT,
+        sku TEXT,
+        ten_san_pham TEXT,
+        so_luong INTEGER,
+        don_gia BIGINT,
+        giam_gia BIGINT,
+        ghi_chu TEXT,
+        PRIMARY KEY (order_id, item_index)
+    );
+    CREATE INDEX IF NOT EXISTS {table}_items_product_idx ON {table}_items (product_id);
+    CREATE INDEX IF NOT EXISTS {table}_items_sku_idx ON {table}_items (sku);
+
+    CREATE TABLE IF NOT EXISTS {table}_shipments(
+        order_id TEXT NOT NULL,
+        shipment_index INTEGER NOT NULL,
+        tracking_code TEXT,
+        don_vi_vc TEXT,
+        trang_thai TEXT,
+        tao_luc TIMESTAMPTZ,
+        phi_vc BIGINT,
+        PRIMARY KEY (order_id, shipment_index)
+    );
+    CREATE INDEX IF NOT EXISTS {table}_shipments_tracking_idx ON {table}_shipments (tracking_code);
+    """
+    with conn.cursor() as cur:
+        cur.execute(sql)
+        conn.commit()
+    print(f"[DB] Bảng {table}_items, {table}_shipments đã sẵn sàng.")
+
+
+def _copy_value(v):
+    """Giá trị Python -> một ô của COPY ... FROM STDIN (text format)."""
+    if v is None:
+        return "\\N"
+    v = str(safe_value(v))
+    return v.replace("\\", "\\\\").replace("\t", "\\t").replace("\n", "\\n").replace("\r", "\\r")
+
+
+def copy_text(rows):
+    """Các dòng -> nội dung COPY ... FROM STDIN (text format), mỗi dòng một bản ghi."""
+    return "".join("\t".join(_copy_value(v) for v in row) + "\n" for row in rows)
+
+
+def _copy_to_stage(cur, table, stage, columns, data):
+    """Tạo bảng tạm `stage` (LIKE table, tự xoá khi commit) và COPY nội dung data (COPY text) vào."""
+    cur.execute(f"CREATE TEMP TABLE {stage} (LIKE {table}) ON COMMIT DROP")
+    cur.copy_expert(f"COPY {stage} ({', '.join(columns)}) FROM STDIN", io.StringIO(data))
+
+
+def _replace_children(cur, child_table, columns, data, order_ids):
+    """Thay các dòng con của order_ids bằng các dòng tương ứng trong data (cùng transaction với bảng cha)."""
+    if not order_ids:
+        return
+    ids = list(order_ids)
+    names = ", ".join(columns)
+    stage = f"_stage_{child_table}"
+    _copy_to_stage(cur, child_table, stage, columns, data)
+    cur.execute(f"DELETE FROM {child_table} WHERE order_id = ANY(%s)", (ids,))
+    cur.execute(f"INSERT INTO {child_table} ({names}) SELECT {names} FROM {stage} WHERE order_id = ANY(%s)", (ids,))
+
+
+def insert_on_conflict(conn, table, records, items=None, shipments=None, columns=fields):
+    """
+    Upsert một lô record bằng COPY FROM STDIN vào bảng tạm rồi merge một lần
+    bằng INSERT ... SELECT ... ON CONFLICT DO UPDATE; chỉ ghi đè dòng có
+    fingerprint khác.
+    order_id trùng trong cùng lô thì giữ bản xuất hiện sau cùng.
+    items/shipments (dòng theo item_fields/shipment_fields, của process_children - mỗi
+    đơn một bản): chỉ thay các dòng con của đơn thực sự thay đổi, trong cùng transaction.
+    columns: tên cột của record (column_names của khai báo cột shop).
+    Trả về (inserted, updated) - số dòng thực sự thay đổi.
+    """
+    if not records:
+        print(f"[DB] {table}: Không có record để insert.")
+        return 0, 0
+    latest = {}
+    for r in records:
+        latest[str(r.get("order_id"))] = r
+    return insert_copy(
+        conn, table, columns,
+        copy_text([r.get(f) for f in columns] for r in latest.values()), len(latest),
+        None if items is None else copy_text(items),
+        None if shipments is None else copy_text(shipments),
+    )
+
+
+def insert_copy(conn, table, columns, data, count, items=None, shipments=None):
+    """
+    Như insert_on_conflict nhưng nhận sẵn nội dung COPY text (order_id không trùng),
+    dùng cho batch đã được encode ở process khác (backfill.py).
+    """
+    stage = f"_stage_{table}"
+    names = ", ".join(columns)
+    updates = ", ".join([f"{c}=EXCLUDED.{c}" for c in columns if c != "order_id"])
+    with conn.cursor() as cur:
+        _copy_to_stage(cur, table, stage, columns, data)
+        cur.execute(f"""
+            WITH up AS (
+                INSERT INTO {table} ({names})
+                SELECT {names} FROM {stage}
+                ON CONFLICT (order_id) DO UPDATE SET {updates}
+                WHERE {table}.fingerprint IS DISTINCT FROM EXCLUDED.fingerprint
+                RETURNING order_id, (xmax = 0) AS inserted
+            )
+            SELECT order_id, inserted FROM up
+        """)
+        changed = cur.fetchall()
+        inserted = sum(1 for _, is_new in changed if is_new)
+        updated = len(changed) - inserted
+        changed_ids = {order_id for order_id, _ in changed}
+        if items is not None:
+            _replace_children(cur, f"{table}_items", item_fields, items, changed_ids)
+        if shipments is not None:
+            _replace_children(cur, f"{table}_shipments", shipment_fields, shipments, changed_ids)
+        conn.commit()
+    unchanged = count - inserted - updated
+    print(f"[DB] {table}: COPY {count} record(s) -> insert {inserted}, update {updated}, không đổi {unchanged}.")
+    return inserted, updated
+
+
+# ========== RAW ARCHIVE ==========
+def create_raw_table(conn, table):
+    """
+    Bảng {table}_raw lưu payload gốc của Pancake (JSONB, nén TOAST lz4 nếu Postgres
+    hỗ trợ - bản 14+ build kèm lz4, không thì pglz mặc định).
+    Bật cho shop đã có dữ liệu: payload của đơn cũ được lưu dần ở các lượt crawl sau
+    (get_fingerprints coi đơn chưa có payload là đã đổi), đủ cả sau lượt crawl full đầu tiên.
+    Dùng để backfill cột mới bằng SQL thay vì crawl lại, ví dụ:
+        UPDATE {table} d SET the = r.payload->>'tags'
+        FROM {table}_raw r WHERE r.order_id = d.order_id;
+    """
+    with conn.cursor() as cur:
+        # Chỉ có dòng này từ Postgres 14, enumvals chỉ gồm các kiểu nén bản build hỗ trợ
+        cur.execute("SELECT 'lz4' = ANY(enumvals) FROM pg_settings WHERE name = 'default_toast_compression'")
+        row = cur.fetchone()
+        compression = " COMPRESSION lz4" if row and row[0] else ""
+        if not compression:
+            print(f"[WARN] Postgres không hỗ trợ nén lz4, {table}_raw dùng nén pglz mặc định.")
+        cur.execute(f"""
+        CREATE TABLE IF NOT EXISTS {table}_raw(
+            order_id TEXT PRIMARY KEY,
+            fingerprint TEXT,
+            payload JSONB{compression},
+            archived_at TIMESTAMP DEFAULT now()
+        );
+        """)
+        conn.commit()
+    print(f"[DB] Bảng {table}_raw đã sẵn sàng.")
+
+
+def archive_raw_orders(conn, table, rows):
+    """
+    Ghi payload gốc, rows: [(order_id, fingerprint, payload_json_text)].
+    Chỉ ghi đè khi fingerprint khác bản đã lưu. Trả về số dòng đã ghi.
+    """
+    if not rows:
+        return 0
+    latest = {}
+    for row in rows:
+        latest[str(row[0])] = row
+    return archive_raw_copy(conn, table, copy_text(latest.values()))
+
+
+def archive_raw_copy(conn, table, data):
+    """Như archive_raw_orders nhưng nhận sẵn nội dung COPY text (order_id không trùng)."""
+    if not data:
+        return 0
+    raw_table = f"{table}_raw"
+    stage = f"_stage_{raw_table}"
+    with conn.cursor() as cur:
+        _copy_to_stage(cur, raw_table, stage, ["order_id", "fingerprint", "payload"], data)
+        cur.execute(f"""
+            INSERT INTO {raw_table} (order_id, fingerprint, payload)
+            SELECT order_id, fingerprint, payload FROM {stage}
+            ON CONFLICT (order_id) DO UPDATE SET
+                fingerprint = EXCLUDED.fingerprint,
+                payload = EXCLUDED.payload,
+                archived_at = now()
+            WHERE {raw_table}.fingerprint IS DISTINCT FROM EXCLUDED.fingerprint
+        """)
+        written = cur.rowcount
+        conn.commit()
+    print(f"[DB] {raw_table}: Lưu {written} payload gốc.")
+    return written
+
+
+def get_fingerprints(conn, table, order_ids, archive_raw=False):
+    """
+    order_id -> fingerprint đã lưu cho các id trong một trang.
+    archive_raw: chỉ tính các đơn đã có payload cùng fingerprint trong {table}_raw,
+    nên đơn chưa được lưu payload (bật archive_raw cho shop đã có dữ liệu) bị coi là
+    đã đổi và được lưu ở lượt crawl kế tiếp đi qua nó (lượt crawl full hằng đêm).
+    """
+    if not order_ids:
+        return {}
+    if archive_raw:
+        sql = f"""
+            SELECT t.order_id, t.fingerprint FROM {table} t
+            JOIN {table}_raw r ON r.order_id = t.order_id AND r.fingerprint = t.fingerprint
+            WHERE t.order_id = ANY(%s)
+        """
+    else:
+        sql = f"SELECT order_id, fingerprint FROM {table} WHERE order_id = ANY(%s)"
+    with conn.cursor() as cur:
+        cur.execute(sql, ([str(i) for i in order_ids],))
+        rows = cur.fetchall()
+        conn.commit()
+    return dict(rows)
+
+
+def mark_seen(conn, table, order_ids, run_id=None):
+    """
+    Bỏ is_deleted của các đơn vừa thấy nếu chúng xuất hiện lại (chỉ đụng các dòng đang
+    bị đánh dấu xoá). run_id: lượt crawl full đang chạy, id được ghi thêm vào bảng
+    phụ {table}_seen (unlogged) để update_is_deleted anti-join, không UPDATE bảng đơn.
+    """
+    if not order_ids:
+        return
+    ids = [str(i) for i in order_ids]
+    with conn.cursor() as cur:
+        cur.execute(f"UPDATE {table} SET is_deleted = FALSE WHERE order_id = ANY(%s) AND is_deleted", (ids,))
+        if run_id is not None:
+            cur.copy_expert(
+                f"COPY {table}_seen (run_id, order_id) FROM STDIN",
+                io.StringIO(copy_text((run_id, i) for i in ids))
+            )
+        conn.commit()
+
+
+def update_is_deleted(conn, table, run_id, seen_count, before, max_ratio=MAX_DELETE_RATIO):
+    """
+    Đánh dấu is_deleted cho các đơn tạo trước `before` (mốc cuối lịch sử mà lượt crawl full
+    run_id đi qua) không có trong {table}_seen của lượt đó: đơn mới hơn do lượt hot/incremental
+    ghi trong lúc lượt full chạy (hoặc dừng chờ chạy tiếp) không được lượt này thấy.
+    Chỉ gọi sau một lượt crawl full trọn vẹn. Bỏ qua nếu bảng phụ thiếu id so với
+    seen_count (bảng unlogged bị làm rỗng sau khi Postgres crash), hoặc nếu số đơn
+    bị xoá vượt max_ratio tổng số đơn (API trả thiếu). Id của lượt này và các lượt
+    bỏ dở trước đó được dọn khỏi bảng phụ.
+    """
+    seen_table = f"{table}_seen"
+    with conn.cursor() as cur:
+        cur.execute(f"SELECT count(*) FROM {seen_table} WHERE run_id = %s", (run_id,))
+        stored = cur.fetchone()[0]
+        deleted = 0
+        if stored < seen_count:
+            print(f"[WARN] {table}: {seen_table} chỉ còn {stored}/{seen_count} id của lượt này, bỏ qua cập nhật is_deleted.")
+        else:
+            cur.execute(f"ANALYZE {seen_table}")
+            cur.execute(
+                f"""
+                UPDATE {table} t SET is_deleted = TRUE
+                WHERE NOT t.is_deleted AND t.tao_luc < %s
+                  AND NOT EXISTS (SELECT 1 FROM {seen_table} s WHERE s.run_id = %s AND s.order_id = t.order_id)
+                """,
+                (before, run_id)
+            )
+            deleted = cur.rowcount
+            if deleted and deleted > max_ratio * (deleted + seen_count):
+                conn.rollback()
+                print(f"[WARN] {table}: {deleted} đơn sẽ bị đánh dấu xoá (> {max_ratio:.0%}), bỏ qua cập nhật is_deleted.")
+                deleted = 0
+        cur.execute(f"DELETE FROM {seen_table} WHERE run_id <= %s", (run_id,))
+        conn.commit()
+    print(f"[DB] {table}: Đánh dấu is_deleted {deleted} đơn.")
+    return deleted
+
+
+# ========== CHECKPOINT (tiến độ lượt crawl) ==========
+def create_checkpoint_table(conn):
+    sql = """
+    CREATE TABLE IF NOT EXISTS crawl_checkpoint(
+        table_name TEXT,
+        kind TEXT,
+        run_id BIGINT,
+        state JSONB,
+        updated_at TIMESTAMP DEFAULT now(),
+        PRIMARY KEY (table_name, kind)
+    );
+    """
+    with conn.cursor() as cur:
+        cur.execute(sql)
+        conn.commit()
+
+
+def get_checkpoint(conn, table, kind):
+    """(run_id, state) của lượt crawl `kind` chưa xong gần nhất, None nếu không có."""
+    with conn.cursor() as cur:
+        cur.execute("SELECT run_id, state FROM crawl_checkpoint WHERE table_name = %s AND kind = %s", (table, kind))
+        row = cur.fetchone()
+        conn.commit()
+    return row
+
+
+def save_checkpoint(conn, table, kind, run_id, state):
+    with conn.cursor() as cur:
+        cur.execute(
+            """
+            INSERT INTO crawl_checkpoint (table_name, kind, run_id, state, updated_at)
+            VALUES (%s, %s, %s, %s, now())
+            ON CONFLICT (table_name, kind) DO UPDATE SET
+                run_id = EXCLUDED.run_id, state = EXCLUDED.state, updated_at = now()
+            """,
+            (table, kind, run_id, json.dumps(state))
+        )
+        conn.commit()
+
+
+def clear_checkpoint(conn, table, kind):
+    with conn.cursor() as cur:
+        cur.execute("DELETE FROM crawl_checkpoint WHERE table_name = %s AND kind = %s", (table, kind))
+        conn.commit()
+
+
+# ========== SWEEP (quét id để phát hiện đơn bị xoá) ==========
+def start_sweep(conn, table, run_id):
+    """
+    Bảng phụ {table}_sweep (unlogged) nhận (order_id, updated_at) của lượt quét run_id,
+    mỗi cửa sổ commit riêng nên lượt quét dài không giữ transaction mở. Dọn id của các
+    lượt quét cũ bỏ dở.
+    """
+    sweep_table = f"{table}_sweep"
+    with conn.cursor() as cur:
+        cur.execute(f"""
+            CREATE UNLOGGED TABLE IF NOT EXISTS {sweep_table}(
+                run_id BIGINT,
+                order_id TEXT,
+                updated_at TEXT
+            );
+            CREATE INDEX IF NOT EXISTS {sweep_table}_idx ON {sweep_table} (run_id, order_id);
+        """)
+        cur.execute(f"DELETE FROM {sweep_table} WHERE run_id <> %s", (run_id,))
+        conn.commit()
+
+
+def copy_sweep_ids(conn, table, run_id, rows):
+    """COPY (order_id, updated_at) của một cửa sổ vào {table}_sweep và commit."""
+    data = copy_text((run_id, order_id, updated_at) for order_id, updated_at in rows)
+    if data:
+        with conn.cursor() as cur:
+            cur.copy_expert(f"COPY {table}_sweep (run_id, order_id, updated_at) FROM STDIN", io.StringIO(data))
+            conn.commit()
+
+
+def abort_sweep(conn, table, run_id):
+    """Lượt quét không trọn vẹn: bỏ các id đã ghi, không đụng bảng đơn."""
+    conn.rollback()
+    with conn.cursor() as cur:
+        cur.execute(f"DELETE FROM {table}_sweep WHERE run_id = %s", (run_id,))
+        conn.commit()
+
+
+def finish_sweep(conn, table, run_id, before, seen_count, max_ratio=MAX_DELETE_RATIO):
+    """
+    Anti-join {table}_sweep của lượt run_id với bảng đơn trong một transaction ngắn:
+    - đơn (tạo trước `before`) không còn trên Pancake -> is_deleted = TRUE
+    - đơn đã đánh dấu xoá nhưng xuất hiện lại -> is_deleted = FALSE
+    - đơn có updated_at khác bản đã lưu (hoặc chưa có) -> lùi watermark về updated_at
+      nhỏ nhất của chúng để lượt incremental sau tải lại.
+    Bảng phụ thiếu id so với seen_count (bị làm rỗng sau khi Postgres crash) hoặc số
+    đơn bị xoá vượt max_ratio thì bỏ cả lượt như update_is_deleted.
+    Trả về (deleted, restored, stale) hoặc None nếu bỏ lượt. Id của lượt được dọn khỏi bảng phụ.
+    """
+    sweep_table = f"{table}_sweep"
+    result = None
+    with conn.cursor() as cur:
+        cur.execute(f"SELECT count(*) FROM {sweep_table} WHERE run_id = %s", (run_id,))
+        stored = cur.fetchone()[0]
+        if stored < seen_count:
+            print(f"[WARN] {table}: {sweep_table} chỉ còn {stored}/{seen_count} id của lượt quét, bỏ qua.")
+        else:
+            cur.execute(f"ANALYZE {sweep_table}")
+            cur.execute(
+                f"""
+                UPDATE {table} t SET is_deleted = TRUE
+                WHERE NOT t.is_deleted AND t.tao_luc < %s
+                  AND NOT EXISTS (SELECT 1 FROM {sweep_table} s WHERE s.run_id = %s AND s.order_id = t.order_id)
+                """,
+                (before, run_id)
+            )
+            deleted = cur.rowcount
+            if deleted and deleted > max_ratio * (deleted + seen_count):
+                conn.rollback()
+                print(f"[WARN] {table}: {deleted} đơn sẽ bị đánh dấu xoá (> {max_ratio:.0%}), bỏ qua lượt quét.")
+            else:
+                cur.execute(
+                    f"""
+                    UPDATE {table} t SET is_deleted = FALSE
+                    FROM {sweep_table} s WHERE s.run_id = %s AND s.order_id = t.order_id AND t.is_deleted
+                    """,
+                    (run_id,)
+                )
+                restored = cur.rowcount
+                cur.execute(
+                    f"""
+                    SELECT count(*), min(s.updated_at::timestamp)
+                    FROM {sweep_table} s LEFT JOIN {table} t ON t.order_id = s.order_id
+                    WHERE s.run_id = %s AND s.updated_at <> ''
+                      AND split_part(t.fingerprint, '|', 2) IS DISTINCT FROM s.updated_at
+                    """,
+                    (run_id,)
+                )
+                stale, oldest = cur.fetchone()
+                if oldest is not None:
+                    cur.execute(
+                        "UPDATE crawl_state SET watermark = LEAST(watermark, %s), updated_at = now() WHERE table_name = %s",
+                        (oldest, table)
+                    )
+                result = deleted, restored, stale
+        cur.execute(f"DELETE FROM {sweep_table} WHERE run_id = %s", (run_id,))
+        conn.commit()
+    if result:
+        print(f"[DB] {table}: Quét id: đánh dấu xoá {result[0]}, khôi phục {result[1]}, {result[2]} đơn cần tải lại.")
+    return result
+
+
+# ========== TIER ==========
+def get_open_order_days(conn, table, before, terminal_statuses):
+    """
+    Các ngày (UTC) có đơn còn mở (trang_thai không thuộc terminal_statuses, chưa xoá)
+    tạo trước `before`: [(date, số đơn)] theo thứ tự ngày.
+    """
+    with conn.cursor() as cur:
+        cur.execute(
+            f"""
+            SELECT (tao_luc AT TIME ZONE 'UTC')::date AS ngay, count(*)
+            FROM {table}
+            WHERE tao_luc < %s AND NOT is_deleted
+              AND (trang_thai IS NULL OR trang_thai <> ALL(%s))
+            GROUP BY 1 ORDER BY 1
+            """,
+            (before, list(terminal_statuses))
+        )
+        rows = cur.fetchall()
+        conn.commit()
+    return rows
+
+
+def count_tiers(conn, table, recent_start, terminal_statuses):
+    """Số đơn (chưa xoá) thuộc tầng hot (còn mở hoặc tạo từ recent_start) và tầng cold."""
+    with conn.cursor() as cur:
+        cur.execute(
+            f"""
+            SELECT count(*) FILTER (
+                       WHERE tao_luc >= %s OR trang_thai IS NULL OR trang_thai <> ALL(%s)
+                   ),
+                   count(*)
+            FROM {table} WHERE NOT is_deleted
+            """,
+            (recent_start, list(terminal_statuses))
+        )
+        hot, total = cur.fetchone()
+        conn.commit()
+    return hot, total - hot
+
+
+# ========== CRAWL STATE (watermark) ==========
+def create_state_table(conn):
+    sql = """
+    CREATE TABLE IF NOT EXISTS crawl_state(
+        table_name TEXT PRIMARY KEY,
+        watermark TIMESTAMP,
+        updated_at TIMESTAMP DEFAULT now()
+    );
+    """
+    with conn.cursor() as cur:
+        cur.execute(sql)
+        conn.commit()
+
+
+def get_watermark(conn, table):
+    """updated_at (UTC) lớn nhất của lượt crawl thành công gần nhất, None nếu chưa có."""
+    with conn.cursor() as cur:
+        cur.execute("SELECT watermark FROM crawl_state WHERE table_name = %s", (table,))
+        row = cur.fetchone()
+        conn.commit()
+    return row[0] if row else None
+
+
+def save_watermark(conn, table, watermark):
+    with conn.cursor() as cur:
+        cur.execute(
+            """
+            INSERT INTO crawl_state (table_name, watermark, updated_at)
+            VALUES (%s, %s, now())
+            ON CONFLICT (table_name) DO UPDATE SET
+                watermark = GREATEST(crawl_state.watermark, EXCLUDED.watermark),
+                updated_at = now()
+            """,
+            (table, watermark)
+        )
+        conn.commit()
+    print(f"[DB] Lưu watermark {watermark} cho {table}.")
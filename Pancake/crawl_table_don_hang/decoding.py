@@ -0,0 +1,144 @@
+"""
+Giải mã response get_orders chỉ với các trường mà mapping cần.
+
+Mỗi đơn của Pancake có ~200 key (warehouse_info, histories, status_history, ...)
+nhưng process_orders chỉ đọc khoảng chục key. Khi có msgspec, page được decode
+theo schema khai báo bên dưới: key không khai báo bị bỏ qua ngay lúc parse,
+không tạo object Python. Nếu shop bật archive_raw thì mỗi đơn được giữ thêm
+dạng bytes gốc ở RAW_KEY để ghi vào bảng _raw.
+Không có msgspec (hoặc shop khai báo extra_columns, cần trường ngoài schema)
+thì dùng orjson/json và parse đầy đủ như trước.
+decode_ids: chỉ id + updated_at, cho lượt quét xoá (sweep.py).
+"""
+import json
+from typing import Any, List, Optional, TypedDict
+
+try:
+    import msgspec
+except ImportError:
+    msgspec = None
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import ijson
+except ImportError:
+    ijson = None
+
+# Key chứa payload gốc (bytes) của đơn khi archive_raw
+RAW_KEY = "_raw"
+
+
+# ======= Schema (chỉ các trường processing_order dùng) =======
+class Order(TypedDict, total=False):
+    id: Any
+    display_id: Any
+    shipments: Any
+    note: Any
+    bill_full_name: Any
+    bill_phone_number: Any
+    ship_full_address: Any
+    note_print: Any
+    items: Any
+    # Any: có đơn trả [] / "" / số thay vì object; extractor tự bỏ qua giá trị không phải dict
+    additional_info: Any
+    inserted_at: Any
+    updated_at: Any
+    total_price: Any
+    status: Any
+
+
+class OrdersPage(TypedDict, total=False):
+    data: Optional[List[Order]]
+    total_pages: Any
+    total_entries: Any
+
+
+class OrderId(TypedDict, total=False):
+    id: Any
+    updated_at: Any
+
+
+class OrderIdsPage(TypedDict, total=False):
+    data: Optional[List[OrderId]]
+    total_pages: Any
+    total_entries: Any
+
+
+if msgspec is not None:
+    class RawOrdersPage(TypedDict, total=False):
+        data: Optional[List[msgspec.Raw]]
+        total_pages: Any
+        total_entries: Any
+
+    _page_decoder = msgspec.json.Decoder(OrdersPage)
+    _raw_page_decoder = msgspec.json.Decoder(RawOrdersPage)
+    _order_decoder = msgspec.json.Decoder(Order)
+    _ids_decoder = msgspec.json.Decoder(OrderIdsPage)
+
+
+def decode_page(body, keep_raw=False, full=False):
+    """
+    bytes của response get_orders -> dict {"data": [order, ...], "total_pages": ...}.
+    full=True: giữ mọi trường của đơn (không lọc theo schema).
+    """
+    if msgspec is None or full:
+        return orjson.loads(body) if orjson is not None else json.loads(body)
+    if not keep_raw:
+        return _page_decoder.decode(body)
+
+    page = _raw_page_decoder.decode(body)
+    orders = []
+    for raw in page.get("data") or []:
+        order = _order_decoder.decode(raw)
+        order[RAW_KEY] = bytes(raw)
+        orders.append(order)
+    page["data"] = orders
+    return page
+
+
+def decode_ids(body):
+    """bytes của response get_orders -> [(id, updated_at)] và metadata phân trang."""
+    if msgspec is not None:
+        page = _ids_decoder.decode(body)
+    else:
+        page = orjson.loads(body) if orjson is not None else json.loads(body)
+    rows = [(str(o.get("id")), o.get("updated_at")) for o in page.get("data") or []]
+    return rows, {k: page.get(k) for k in ("total_pages", "total_entries")}
+
+
+def iter_order_chunks(resp, chunk_size, keep_raw=False, full=False):
+    """
+    Đọc response (requests, stream=True) và yield từng lô chunk_size đơn của
+    mảng "data" ngay khi parse xong, không giữ cả body trong bộ nhớ.
+    Cần ijson; không có thì đọc hết body rồi decode_page như bình thường.
+    """
+    if ijson is None:
+        orders = decode_page(resp.content, keep_raw, full).get("data") or []
+        for i in range(0, len(orders), chunk_size):
+            yield orders[i:i + chunk_size]
+        return
+
+    resp.raw.decode_content = True  # urllib3 giải nén gzip/br khi đọc
+    keys = None if keep_raw or full else Order.__annotations__.keys()
+    chunk = []
+    for order in ijson.items(resp.raw, "data.item", use_float=True):
+        if keys is not None:
+            order = {k: order[k] for k in keys if k in order}
+        chunk.append(order)
+        if len(chunk) >= chunk_size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def raw_payload(order):
+    """Payload JSON gốc của một đơn (text) để lưu archive."""
+    raw = order.get(RAW_KEY)
+    if raw is not None:
+        return raw.decode("utf-8")
+    return json.dumps(order, ensure_ascii=False)
@@ -0,0 +1,180 @@
+"""
+HTTP client dùng chung cho mọi request get_orders của các shop.
+
+- Một requests.Session (pool keep-alive) cho cả process.
+- Thử lại khi 429/5xx/timeout/mất kết nối, backoff luỹ thừa có jitter
+  (random(0, base * 2^n), tôn trọng Retry-After).
+- TokenBucket giới hạn tổng số request/giây của tất cả shop; gặp 429 thì cả
+  bucket tạm dừng, không chỉ shop bị chặn.
+- CircuitBreaker: CIRCUIT_FAILURES lỗi liên tiếp thì ngắt, mọi request fail
+  ngay trong CIRCUIT_RESET_SECONDS rồi cho một request đi thử.
+- Hedging (HTTP_HEDGE): request chưa xong sau p95 độ trễ gần đây thì gửi thêm
+  một bản, lấy kết quả về trước. get_orders chỉ đọc nên gửi trùng không sao.
+"""
+import random
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, TimeoutError, wait
+
+import requests
+
+from config.pancake_config.api_params import (
+    HTTP_MAX_RETRIES, HTTP_BACKOFF_BASE, HTTP_BACKOFF_MAX, HTTP_RATE_LIMIT, HTTP_RATE_BURST,
+    CIRCUIT_FAILURES, CIRCUIT_RESET_SECONDS, HTTP_HEDGE,
+)
+
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+# Số mẫu độ trễ tối thiểu trước khi bắt đầu hedge
+HEDGE_MIN_SAMPLES = 20
+
+
+class CircuitOpenError(RuntimeError):
+    pass
+
+
+class TokenBucket:
+    """Giới hạn rate request/giây, cho phép dồn tối đa burst request."""
+
+    def __init__(self, rate=HTTP_RATE_LIMIT, burst=HTTP_RATE_BURST):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = burst
+        self.updated = time.monotonic()
+        self.paused_until = 0.0
+        self.lock = threading.Lock()
+
+    def acquire(self):
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if now >= self.paused_until and self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait_for = max(self.paused_until - now, (1 - self.tokens) / self.rate)
+            time.sleep(wait_for)
+
+    def pause(self, seconds):
+        """Tạm dừng mọi request (khi server trả 429)."""
+        with self.lock:
+            self.paused_until = max(self.paused_until, time.monotonic() + seconds)
+
+
+class CircuitBreaker:
+    def __init__(self, failures=CIRCUIT_FAILURES, reset_seconds=CIRCUIT_RESET_SECONDS):
+        self.threshold = failures
+        self.reset_seconds = reset_seconds
+        self.failures = 0
+        self.opened_at = None
+        self.trial = False
+        self.lock = threading.Lock()
+
+    def check(self):
+        """Raise CircuitOpenError nếu đang ngắt; hết thời gian ngắt thì cho đúng một request đi thử."""
+        with self.lock:
+            if self.opened_at is None:
+                return
+            remaining = self.reset_seconds - (time.monotonic() - self.opened_at)
+            if remaining > 0 or self.trial:
+                raise CircuitOpenError(f"Circuit breaker đang ngắt (còn {max(remaining, 0):.0f}s) sau {self.failures} lỗi liên tiếp")
+            self.trial = True
+
+    def record(self, ok):
+        with self.lock:
+            if ok:
+                if self.opened_at is not None:
+                    print("[HTTP] Circuit breaker đóng lại, Pancake đã phản hồi bình thường.")
+                self.failures = 0
+                self.opened_at = None
+            else:
+                self.failures += 1
+                if self.failures >= self.threshold and (self.opened_at is None or self.trial):
+                    print(f"[HTTP] Circuit breaker ngắt {self.reset_seconds}s sau {self.failures} lỗi liên tiếp.")
+                    self.opened_at = time.monotonic()
+            self.trial = False
+
+
+def _close_response(future):
+    if not future.cancelled() and future.exception() is None:
+        future.result().close()
+
+
+class PancakeClient:
+    """Thay cho requests.Session trong crawler: cùng hàm post()/close()."""
+
+    def __init__(self, session, limiter=None, breaker=None, max_retries=HTTP_MAX_RETRIES, hedge=HTTP_HEDGE, pool_size=10):
+        self.session = session
+        self.limiter = limiter or TokenBucket()
+        self.breaker = breaker or CircuitBreaker()
+        self.max_retries = max_retries
+        self.latencies = deque(maxlen=500)
+        self._hedge_pool = ThreadPoolExecutor(max_workers=pool_size * 2) if hedge else None
+
+    def post(self, url, **kwargs):
+        """session.post có retry/backoff/rate limit/circuit breaker. Response không thử lại được thì trả về nguyên."""
+        for attempt in range(self.max_retries + 1):
+            self.breaker.check()
+            self.limiter.acquire()
+            start = time.monotonic()
+            resp = None
+            try:
+                resp = self._send(url, kwargs)
+            except (requests.Timeout, requests.ConnectionError) as e:
+                error = e
+            else:
+                if resp.status_code not in RETRY_STATUSES:
+                    self.breaker.record(True)
+                    self.latencies.append(time.monotonic() - start)
+                    return resp
+                error = f"HTTP {resp.status_code}"
+            # 429 là bị giới hạn rate, server vẫn sống: không tính là lỗi cho circuit breaker
+            self.breaker.record(resp is not None and resp.status_code == 429)
+            if attempt == self.max_retries:
+                if resp is not None:
+                    return resp
+                raise error
+
+            delay = self._backoff(attempt, resp)
+            if resp is not None:
+                if resp.status_code == 429:
+                    self.limiter.pause(delay)
+                resp.close()
+            print(f"[HTTP] {error}, thử lại lần {attempt + 1}/{self.max_retries} sau {delay:.1f}s.")
+            time.sleep(delay)
+
+    def _backoff(self, attempt, resp):
+        delay = random.uniform(0, min(HTTP_BACKOFF_MAX, HTTP_BACKOFF_BASE * 2 ** attempt))
+        retry_after = resp.headers.get("Retry-After") if resp is not None else None
+        if retry_after and retry_after.isdigit():
+            delay = max(delay, min(float(retry_after), HTTP_BACKOFF_MAX))
+        return delay
+
+    def p95(self):
+        latencies = sorted(self.latencies)
+        return latencies[int(0.95 * (len(latencies) - 1))]
+
+    def _send(self, url, kwargs):
+        if self._hedge_pool is None or kwargs.get("stream") or len(self.latencies) < HEDGE_MIN_SAMPLES:
+            return self.session.post(url, **kwargs)
+
+        first = self._hedge_pool.submit(self.session.post, url, **kwargs)
+        try:
+            return first.result(timeout=self.p95())
+        except TimeoutError:
+            pass
+        self.limiter.acquire()
+        second = self._hedge_pool.submit(self.session.post, url, **kwargs)
+        done, _ = wait([first, second], return_when=FIRST_COMPLETED)
+        winner = done.pop()
+        loser = second if winner is first else first
+        if winner.exception() is not None:
+            winner, loser = loser, winner  # bản về trước lỗi thì chờ bản còn lại
+        loser.add_done_callback(_close_response)
+        return winner.result()
+
+    def close(self):
+        if self._hedge_pool is not None:
+            self._hedge_pool.shutdown(wait=False)
+        self.session.close()
@@ -0,0 +1,87 @@
+import queue
+import threading
+
+_DONE = object()
+
+
+def _put(q, item, stop):
+    """put có kiểm tra cờ dừng; trả về False nếu pipeline đã bị huỷ."""
+    while not stop.is_set():
+        try:
+            q.put(item, timeout=0.5)
+            return True
+        except queue.Full:
+            continue
+    return False
+
+
+def _get(q, stop):
+    while not stop.is_set():
+        try:
+            return q.get(timeout=0.5)
+        except queue.Empty:
+            continue
+    return _DONE
+
+
+def run_pipeline(source, transform, sink, maxsize=2):
+    """
+    Chạy source -> transform -> sink theo từng trang:
+    - source: generator yield từng trang (chạy ở thread riêng), giá trị return
+      của generator được trả lại cho người gọi.
+    - transform: hàm xử lý một trang (chạy ở thread riêng).
+    - sink: hàm ghi một trang (chạy ở thread gọi, giữ kết nối DB).
+    Giữa các bước là hàng đợi giới hạn `maxsize` trang, nên bộ nhớ chỉ phụ thuộc
+    kích thước trang, và tải trang sau chồng lên lúc ghi trang trước.
+    """
+    stop = threading.Event()
+    raw_q = queue.Queue(maxsize=maxsize)
+    rows_q = queue.Queue(maxsize=maxsize)
+    state = {"result": None, "error": None}
+
+    def produce():
+        try:
+            while not stop.is_set():
+                try:
+                    item = next(source)
+                except StopIteration as done:
+                    state["result"] = done.value
+                    break
+                if not _put(raw_q, item, stop):
+                    break
+        except Exception as e:
+            state["error"] = e
+        finally:
+            source.close()
+            _put(raw_q, _DONE, stop)
+
+    def convert():
+        try:
+            while True:
+                item = _get(raw_q, stop)
+                if item is _DONE:
+                    break
+                if not _put(rows_q, transform(item), stop):
+                    break
+        except Exception as e:
+            state["error"] = e
+        finally:
+            _put(rows_q, _DONE, stop)
+
+    threads = [threading.Thread(target=produce, daemon=True), threading.Thread(target=convert, daemon=True)]
+    for t in threads:
+        t.start()
+    try:
+        while True:
+            item = _get(rows_q, stop)
+            if item is _DONE:
+                break
+            sink(item)
+    finally:
+        stop.set()
+        for t in threads:
+            t.join()
+
+    if state["error"]:
+        raise state["error"]
+    return state["result"]
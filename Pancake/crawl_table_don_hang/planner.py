@@ -0,0 +1,165 @@
+"""
+Crawl full theo cửa sổ thời gian inserted_at thay cho phân trang offset trên
+toàn bộ lịch sử của shop.
+
+Phân trang page=N trên cả lịch sử bị xô lệch khi có đơn mới chen vào giữa lúc
+crawl (đơn bị lặp hoặc bị sót giữa các trang), trang càng sâu server càng chậm.
+Ở đây:
+- plan_windows chia [HISTORY_START, lúc lập kế hoạch) thành các cửa sổ liền
+  nhau, không chồng nhau. Mỗi cửa sổ được đếm số đơn bằng một request
+  page_size=1 (total_entries); cửa sổ nhiều hơn WINDOW_MAX_ORDERS thì chia nhỏ
+  theo tỉ lệ, nên giai đoạn bán nhiều có cửa sổ ngắn, giai đoạn vắng có cửa sổ dài.
+- Cửa sổ nằm trọn trong quá khứ (kể cả cửa sổ cuối, kết thúc ở lúc lập kế
+  hoạch) nên đơn mới không chen vào được, phân trang trong cửa sổ ổn định và chỉ vài trang.
+- iter_windows crawl max_concurrency cửa sổ song song; số đơn lấy được phải
+  khớp số đã đếm (lệch thì crawl lại cửa sổ một lần), bỏ đơn trùng trong cửa sổ.
+Đơn mới hơn lúc lập kế hoạch để lượt incremental sau lấy.
+ranges: chỉ crawl một số khoảng thời gian (tầng hot, tiers.py) thay vì cả lịch sử.
+"""
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from datetime import datetime, timezone
+
+from config.pancake_config.api_params import DEFAULT_PAGE_SIZE, WINDOW_MAX_ORDERS, WINDOW_MIN_SECONDS, HISTORY_START
+from crawl_table_don_hang.crawler import fetch_page_body, crawl_batches
+from crawl_table_don_hang.decoding import decode_page
+
+
+class WindowDone(tuple):
+    """(start, end) của một cửa sổ đã yield hết đơn; iter_windows(mark_done=True) yield sau lô cuối của cửa sổ."""
+
+
+def fmt_time(ts):
+    return datetime.fromtimestamp(ts, tz=timezone.utc).strftime("%Y-%m-%d %H:%M")
+
+
+def history_ranges(end):
+    """Cả lịch sử đơn của shop: [(HISTORY_START, end)] (unix giây)."""
+    return [(int(datetime.fromisoformat(HISTORY_START).replace(tzinfo=timezone.utc).timestamp()), int(end))]
+
+
+def count_orders(session, shop, window):
+    """Số đơn có inserted_at trong cửa sổ (total_entries); None nếu API không trả."""
+    data = decode_page(fetch_page_body(session, shop, 1, 1, window=window))
+    total = data.get("total_entries") if isinstance(data, dict) else None
+    return total if isinstance(total, int) and total >= 0 else None
+
+
+def plan_windows(session, shop, ranges, max_orders=WINDOW_MAX_ORDERS, concurrency=1, stats=None):
+    """
+    Chia các khoảng [(start, end)] (unix giây, không chồng nhau) thành các cửa sổ
+    [(start, end, số đơn)] theo thứ tự thời gian, mỗi cửa sổ không quá max_orders đơn
+    (trừ khi đã ngắn tới WINDOW_MIN_SECONDS).
+    API không trả total_entries thì cửa sổ giữ nguyên, số đơn là None.
+    """
+    windows = []
+    pending = [(s, e) for s, e in ranges if e > s]
+    with ThreadPoolExecutor(max_workers=max(1, concurrency)) as pool:
+        while pending:
+            counts = list(pool.map(lambda w: count_orders(session, shop, w), pending))
+            if stats is not None:
+                stats["probes"] += len(pending)
+            split = []
+            for (s, e), n in zip(pending, counts):
+                if n == 0:
+                    continue
+                if n is None or n <= max_orders or e - s <= WINDOW_MIN_SECONDS:
+                    windows.append((s, e, n))
+                    continue
+                # Chia đều theo thời gian thành đủ phần để mỗi phần ước chừng max_orders đơn
+                parts = min(-(-n // max_orders), max(2, (e - s) // WINDOW_MIN_SECONDS))
+                step = -(-(e - s) // parts)
+                split.extend((b, min(b + step, e)) for b in range(s, e, step))
+            pending = split
+    return sorted(windows)
+
+
+def crawl_window(session, shop, window, page_size, retries=1):
+    """Crawl một cửa sổ (từng trang, tuần tự). Trả về (orders không trùng id, complete)."""
+    start, end, expected = window
+    for attempt in range(retries + 1):
+        orders, complete = crawl_batches(session, shop, page_size, concurrency=1, window=(start, end), quiet=True)
+        unique = list({o.get("id"): o for o in orders}.values())
+        if complete and (expected is None or len(unique) >= expected):
+            return unique, True
+        if attempt < retries:
+            print(
+                f"[WARN] [{shop['name']}] Cửa sổ {fmt_time(start)} -> {fmt_time(end)}: lấy {len(unique)}/{expected} đơn, crawl lại."
+            )
+    return unique, False
+
+
+def iter_windows(session, shop, page_size=None, concurrency=None, end=None, ranges=None, stats=None, mark_done=False):
+    """
+    Generator: crawl full shop theo cửa sổ thời gian, yield từng lô đơn (<= page_size)
+    theo thứ tự cửa sổ xong trước. Giá trị return là complete như iter_pages:
+    False nếu có cửa sổ lỗi hoặc lấy thiếu đơn so với số đã đếm.
+    ranges: các khoảng [(start, end)] cần crawl, mặc định [HISTORY_START, end).
+    stats: dict nhận số cửa sổ / request đếm (probes) / request trang (pages).
+    mark_done: sau các lô của mỗi cửa sổ lấy đủ đơn, yield thêm WindowDone((start, end)) để ghi checkpoint.
+    """
+    tag = f"[{shop['name']}]"
+    page_size = page_size or shop.get("page_size") or DEFAULT_PAGE_SIZE or 100
+    concurrency = max(1, concurrency or shop.get("max_concurrency") or 1)
+    end = int(end or time.time())
+    if ranges is None:
+        ranges = history_ranges(end)
+    stats = stats if stats is not None else {}
+    stats.update(windows=0, probes=0, pages=0)
+
+    plan_start = time.time()
+    try:
+        windows = plan_windows(session, shop, ranges, concurrency=concurrency, stats=stats)
+    except RuntimeError as e:
+        print(f"[ERROR] {tag} Không lập được kế hoạch crawl: {e}")
+        return False
+    expected = sum(n or 0 for _, _, n in windows)
+    stats["windows"] = len(windows)
+    print(
+        f"[PLAN] {tag} {len(windows)} cửa sổ, khoảng {expected} đơn, {concurrency} cửa sổ song song "
+        f"(lập kế hoạch {time.time() - plan_start:.1f}s)."
+    )
+
+    total = 0
+    done_windows = 0
+    complete = True
+    remaining = iter(windows)
+    running = {}
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        def submit():
+            window = next(remaining, None)
+            if window is not None:
+                running[pool.submit(crawl_window, session, shop, window, page_size)] = window
+
+        for _ in range(concurrency):
+            submit()
+        try:
+            while running:
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    s, e, n = running.pop(future)
+                    submit()
+                    try:
+                        orders, ok = future.result()
+                    except RuntimeError as err:
+                        print(f"[ERROR] {tag} Cửa sổ {fmt_time(s)} -> {fmt_time(e)}: {err}")
+                        orders, ok = [], False
+                    complete = complete and ok
+                    total += len(orders)
+                    stats["pages"] += len(orders) // page_size + 1
+                    done_windows += 1
+                    print(
+                        f"[OK] {tag} Cửa sổ {done_windows}/{len(windows)} {fmt_time(s)} -> {fmt_time(e)}: "
+                        f"{len(orders)}{'' if n is None else '/' + str(n)} đơn. Total={total}"
+                    )
+                    for i in range(0, len(orders), page_size):
+                        yield orders[i:i + page_size]
+                    if mark_done and ok:
+                        yield WindowDone((s, e))
+        finally:
+            for future in running:
+                future.cancel()
+
+    if not complete:
+        print(f"[WARN] {tag} Có cửa sổ lỗi hoặc thiếu đơn, crawl full chưa trọn vẹn.")
+    return complete
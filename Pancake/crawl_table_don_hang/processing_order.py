@@ -0,0 +1,273 @@
+from decimal import Decimal, InvalidOperation, ROUND_HALF_UP
+from datetime import timedelta
+import hashlib
+import json
+
+from crawl_table_don_hang.datetimes import to_utc
+
+# ======= Các cột trong DB =======
+# Khai báo duy nhất của mapping đơn -> dòng: (cột, kiểu SQL, đường dẫn trong đơn, cách chuyển).
+# Đường dẫn có dấu chấm là trường lồng nhau ("additional_info.delivery_deadline").
+# create_table, fields, câu upsert và hàm extract đều sinh ra từ danh sách này;
+# shop có thể thêm cột riêng qua "extra_columns" trong shops_config.
+ORDER_COLUMNS = [
+    ("order_id", "TEXT PRIMARY KEY", "id", "raw"),
+    ("id", "TEXT", "display_id", "text"),
+    ("vc", "TEXT", "shipments", "text"),
+    ("the", "TEXT", None, "empty"),
+    ("ghi_chu", "TEXT", "note", "text"),
+    ("khach_hang", "TEXT", "bill_full_name", "text"),
+    ("sdt", "TEXT", "bill_phone_number", "text"),
+    ("nhan_hang", "TEXT", "ship_full_address", "text"),
+    ("ghi_chu_dvvc", "TEXT", "note_print", "text"),
+    ("san_pham", "TEXT", "items", "items_json"),
+    ("han_ban_giao_don", "TIMESTAMPTZ", "additional_info.delivery_deadline", "timestamp_memo"),
+    ("tao_luc", "TIMESTAMPTZ", "inserted_at", "timestamp"),
+    ("cap_nhat_tt", "TIMESTAMPTZ", "updated_at", "timestamp"),
+    ("tong_tien", "BIGINT", "total_price", "money"),
+    ("trang_thai", "SMALLINT", "status", "int"),
+]
+fields = [c[0] for c in ORDER_COLUMNS] + ["fingerprint"]
+
+# Tăng khi đổi logic mapping để mọi đơn được map lại dù updated_at không đổi
+FINGERPRINT_VERSION = "v4"
+
+# ======= Các cột bảng con =======
+item_fields = [
+    "order_id", "item_index", "item_id", "product_id", "variation_id", "sku",
+    "ten_san_pham", "so_luong", "don_gia", "giam_gia", "ghi_chu"
+]
+shipment_fields = [
+    "order_id", "shipment_index", "tracking_code", "don_vi_vc",
+    "trang_thai", "tao_luc", "phi_vc"
+]
+
+# ======= Hàm extract =======
+def extract_text_only(f, key):
+    return f.get(key, "") or ""
+
+def extract_number_to_decimal(f, key):
+    default = Decimal("0.00")
+    v = f.get(key, default)
+    try:
+        if isinstance(v, str):
+            v = v.replace(",", "").replace("₫", "").strip()
+        return Decimal(v).quantize(Decimal("0.01"))
+    except (InvalidOperation, ValueError, TypeError):
+        return default
+
+def money_to_int(v):
+    """Tiền VND -> int (làm tròn), 0 nếu không đọc được."""
+    try:
+        if isinstance(v, str):
+            v = v.replace(",", "").replace("₫", "").strip()
+        return int(Decimal(v).to_integral_value(ROUND_HALF_UP))
+    except (InvalidOperation, ValueError, TypeError):
+        return 0
+
+def to_int(v):
+    try:
+        return int(v)
+    except (ValueError, TypeError):
+        return None
+
+def extract_number_to_int(f, key):
+    return money_to_int(f.get(key, 0))
+
+def extract_int(f, key):
+    return to_int(f.get(key))
+
+def get_path(o, path):
+    """Giá trị theo đường dẫn có dấu chấm ("a.b"), None nếu thiếu ở bất kỳ cấp nào."""
+    if path is None:
+        return None
+    for key in path.split("."):
+        if not isinstance(o, dict):
+            return None
+        o = o.get(key)
+    return o
+
+def safe_value(val):
+    """Nếu là dict/list thì chuyển sang JSON string"""
+    if isinstance(val, (dict, list)):
+        return json.dumps(val, ensure_ascii=False)
+    return val
+
+def excel_serial_to_datetime(fields, key):
+    """Serial ngày của Excel/Google Sheets -> datetime (không timezone)."""
+    dt = to_utc(fields.get(key), key)
+    return dt.replace(tzinfo=None) if dt else None
+
+def format_any_datetime(value, tz_offset_hours=7, fmt="%Y/%m/%d %H:%M:%S"):
+    dt = to_utc(value, "format_any_datetime")
+    if dt is None:
+        return None
+    return (dt + timedelta(hours=tz_offset_hours)).strftime(fmt)
+
+def to_utc_datetime(value, field=None, memo=False):
+    """
+    Thời gian của Pancake (ISO không timezone = UTC, epoch ms, datetime, list)
+    -> datetime có tzinfo UTC để ghi thẳng vào cột TIMESTAMPTZ. None nếu rỗng.
+    Lỗi được đếm theo field (xem datetimes.report_failures).
+    """
+    return to_utc(value, field, memo)
+
+
+# ======= Fingerprint =======
+def fingerprint_prefix(order):
+    return f"{FINGERPRINT_VERSION}|{order.get('updated_at')}|"
+
+
+def make_fingerprint(order, record, names=None):
+    """"<version>|<updated_at gốc>|<md5 các cột đã map>" để biết đơn có thay đổi không."""
+    names = names or [f for f in fields if f != "fingerprint"]
+    payload = json.dumps([safe_value(record.get(f)) for f in names], ensure_ascii=False, default=str)
+    return fingerprint_prefix(order) + hashlib.md5(payload.encode("utf-8")).hexdigest()
+
+
+def drop_unchanged(orders, known):
+    """
+    Bỏ các đơn có updated_at trùng với fingerprint đã lưu (known: order_id -> fingerprint),
+    để không phải map lại đơn không đổi.
+    """
+    return [o for o in orders if not (known.get(str(o.get("id"))) or "").startswith(fingerprint_prefix(o))]
+
+
+# ======= Order -> bảng con =======
+def _first(d, *keys):
+    for k in keys:
+        v = d.get(k)
+        if v not in (None, ""):
+            return v
+    return None
+
+
+def extract_items(o):
+    """items của một đơn -> các dòng theo item_fields."""
+    rows = []
+    for idx, it in enumerate(o.get("items") or []):
+        if not isinstance(it, dict):
+            continue
+        info = it.get("variation_info") or {}
+        rows.append((
+            o.get("id"),
+            idx,
+            it.get("id"),
+            _first(it, "product_id") or info.get("product_id"),
+            _first(it, "variation_id") or info.get("id"),
+            _first(info, "display_id", "barcode"),
+            _first(info, "name") or it.get("name"),
+            it.get("quantity"),
+            extract_number_to_int(info, "retail_price"),
+            extract_number_to_int(it, "total_discount"),
+            it.get("note"),
+        ))
+    return rows
+
+
+def extract_shipments(o):
+    """shipments của một đơn -> các dòng theo shipment_fields."""
+    rows = []
+    for idx, sh in enumerate(o.get("shipments") or []):
+        if not isinstance(sh, dict):
+            continue
+        rows.append((
+            o.get("id"),
+            idx,
+            _first(sh, "tracking_code", "tracking_id", "extend_code"),
+            _first(sh, "partner_name", "partner", "carrier"),
+            _first(sh, "status"),
+            to_utc_datetime(_first(sh, "inserted_at", "created_at"), "shipments.inserted_at"),
+            extract_number_to_int(sh, "fee"),
+        ))
+    return rows
+
+
+def process_children(orders):
+    """
+    Dòng items/shipments của các đơn. order_id trùng (trang offset bị xô trong lúc crawl)
+    thì chỉ lấy dòng con của bản xuất hiện sau cùng, như record trong insert_on_conflict.
+    """
+    latest = {}
+    for o in orders:
+        latest[str(o.get("id"))] = o
+    items, shipments = [], []
+    for o in latest.values():
+        items.extend(extract_items(o))
+        shipments.extend(extract_shipments(o))
+    return items, shipments
+
+
+# ======= Order -> record =======
+# Biểu thức chuyển đổi theo loại; {v} là giá trị nguồn, {path} là đường dẫn
+CONVERTERS = {
+    "raw": "{v}",
+    "text": "{v} or ''",
+    "empty": "''",
+    "items_json": "json.dumps({v}, ensure_ascii=False) if {v} else 'Chưa có sản phẩm'",
+    "timestamp": "to_utc({v}, {path!r})",
+    "timestamp_memo": "to_utc({v}, {path!r}, True)",
+    "money": "money_to_int({v})",
+    "int": "to_int({v})",
+}
+# Loại có thể ra dict/list, cần safe_value khi tính fingerprint
+_MAYBE_JSON = {"raw", "text"}
+
+_extractors = {}
+
+
+def shop_columns(shop):
+    """Các cột của bảng đơn của shop: ORDER_COLUMNS + extra_columns của shop."""
+    return ORDER_COLUMNS + [tuple(c) for c in shop.get("extra_columns", [])]
+
+
+def column_names(columns):
+    return [c[0] for c in columns] + ["fingerprint"]
+
+
+def compile_extractor(columns=ORDER_COLUMNS):
+    """
+    Sinh một hàm extract(order) -> record chạy thẳng từ trên xuống (không vòng lặp,
+    không tra bảng) cho danh sách cột, kể cả fingerprint. Hàm được cache theo columns.
+    """
+    key = tuple(columns)
+    extract = _extractors.get(key)
+    if extract is not None:
+        return extract
+
+    lines = ["def extract(o):"]
+    for i, (_, _, path, kind) in enumerate(columns):
+        v = f"v{i}"
+        if path is None:
+            lines.append(f"    {v} = None")
+        else:
+            first, *rest = path.split(".")
+            lines.append(f"    {v} = o.get({first!r})")
+            for part in rest:
+                lines.append(f"    {v} = {v}.get({part!r}) if type({v}) is dict else None")
+        lines.append(f"    c{i} = " + CONVERTERS[kind].format(v=v, path=path))
+    record = ", ".join(f"{name!r}: c{i}" for i, (name, *_) in enumerate(columns))
+    payload = ", ".join(
+        f"safe_value(c{i})" if kind in _MAYBE_JSON else f"c{i}"
+        for i, (_, _, _, kind) in enumerate(columns)
+    )
+    lines.append(f"    r = {{{record}}}")
+    lines.append(
+        f"    r['fingerprint'] = fingerprint_prefix(o) + md5(json.dumps([{payload}], "
+        "ensure_ascii=False, default=str).encode('utf-8')).hexdigest()"
+    )
+    lines.append("    return r")
+
+    namespace = {
+        "json": json, "md5": hashlib.md5, "to_utc": to_utc, "money_to_int": money_to_int,
+        "to_int": to_int, "safe_value": safe_value, "fingerprint_prefix": fingerprint_prefix,
+    }
+    exec("\n".join(lines), namespace)
+    extract = _extractors[key] = namespace["extract"]
+    return extract
+
+
+def process_orders(orders, columns=ORDER_COLUMNS):
+    extract = compile_extractor(columns)
+    processed = [extract(o) for o in orders]
+    return [r["order_id"] for r in processed], processed
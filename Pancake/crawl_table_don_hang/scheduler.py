@@ -0,0 +1,229 @@
+"""
+Scheduler asyncio: chạy nhiều job đồng bộ (crawl từng shop Pancake, đồng bộ
+các sheet) trong một event loop thay cho vòng `schedule.run_pending()` của
+từng script.
+
+- Mỗi job có chu kỳ riêng (giây) hoặc giờ chạy cố định hằng ngày (at="02:00").
+- Lịch bám theo mốc (mốc trước + interval), không cộng thời gian chạy/ngủ nên
+  không bị trôi. Jitter ngẫu nhiên để các job không dồn vào cùng một giây.
+- Job theo chu kỳ chạy lượt đầu ngay khi khởi động; job nặng đặt stagger=True
+  thì lượt đầu rơi ngẫu nhiên trong chu kỳ đầu, nên khởi động lại process (deploy,
+  crash loop) không kéo theo một lượt của mọi shop cùng lúc.
+- Job đến hạn mà lượt trước chưa xong thì bỏ lượt, không chạy chồng, không dồn hàng.
+- Job cùng group (incremental và full của một shop) không chạy cùng lúc: đến
+  hạn mà group đang bận thì chờ, job chờ trước được chạy trước.
+- Tối đa MAX_CONCURRENT_JOBS job chạy cùng lúc; job là hàm đồng bộ, chạy trên thread pool.
+- Chu kỳ thích ứng (min_interval/max_interval): job trả về số dòng thay đổi;
+  lượt không có gì mới thì giãn chu kỳ (tới max), lượt đổi nhiều (>= busy_rows)
+  thì thu hẹp (tới min), đổi ít thì kéo dần về chu kỳ gốc. Đêm vắng đỡ tải
+  API/DB, giờ cao điểm dữ liệu mới hơn.
+- Mỗi job nhớ lần chạy tới, thời gian chạy lần trước, kết quả; report() in bảng trạng thái.
+"""
+import asyncio
+import random
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+
+# Số job chạy cùng lúc tối đa (mỗi shop đã tự song song bên trong)
+MAX_CONCURRENT_JOBS = 4
+# Jitter mặc định: tới 10% chu kỳ, tối đa 30s
+JITTER_RATIO = 0.1
+JITTER_MAX = 30
+# Job đến hạn mà group bận thì kiểm tra lại sau bấy nhiêu giây
+GROUP_RETRY_SECONDS = 5
+# Chu kỳ thích ứng: nhân với hệ số này khi lượt không đổi gì / khi lượt đổi nhiều
+ADAPT_GROW = 1.5
+ADAPT_SHRINK = 0.5
+# Số dòng đổi trong một lượt coi là "đang bận"
+ADAPT_BUSY_ROWS = 50
+# In bảng trạng thái mỗi 15 phút
+REPORT_SECONDS = 15 * 60
+
+
+def _fmt(ts):
+    return datetime.fromtimestamp(ts).strftime("%H:%M:%S") if ts else "-"
+
+
+class Job:
+    """
+    Một job định kỳ: func(*args, **kwargs) chạy mỗi interval giây, hoặc hằng ngày lúc at ("HH:MM").
+    Có min_interval/max_interval thì chu kỳ thích ứng theo số dòng đổi func trả về
+    (func trả None, ví dụ khi lỗi, thì giữ nguyên chu kỳ).
+    stagger=True: lượt đầu vào lúc ngẫu nhiên trong [now, now + interval) thay vì ngay.
+    """
+
+    def __init__(self, name, func, interval=None, at=None, jitter=None, group=None, args=(), kwargs=None,
+                 min_interval=None, max_interval=None, busy_rows=ADAPT_BUSY_ROWS, stagger=False):
+        if not interval and not at:
+            raise ValueError(f"Job {name}: cần interval hoặc at.")
+        self.name = name
+        self.func = func
+        self.interval = interval
+        self.base_interval = interval
+        self.min_interval = min(min_interval or interval, interval) if interval else None
+        self.max_interval = max(max_interval or interval, interval) if interval else None
+        self.busy_rows = busy_rows
+        self.at = at
+        self.jitter = jitter if jitter is not None else min(JITTER_MAX, (interval or 0) * JITTER_RATIO)
+        self.group = group
+        self.stagger = stagger
+        self.args = args
+        self.kwargs = kwargs or {}
+
+        self.due = None        # mốc lịch (chưa cộng jitter)
+        self.run_due = None    # mốc của lượt đang/vừa chạy
+        self.next_run = None   # lần chạy tới (đã cộng jitter)
+        self.running = False   # đang chạy hoặc đang chờ slot
+        self.waiting_since = None  # đến hạn nhưng group đang bận
+        self.runs = 0
+        self.skipped = 0
+        self.last_duration = None
+        self.last_result = None
+        self.last_error = None
+
+    def call(self):
+        return self.func(*self.args, **self.kwargs)
+
+    def schedule_first(self, now):
+        if self.at:
+            self.due = self._next_at(now)
+        elif self.stagger:
+            self.due = now + random.uniform(0, self.interval)
+        else:
+            self.due = now
+        self.next_run = self.due + random.uniform(0, self.jitter)
+
+    def schedule_next(self, now):
+        """Dời mốc sang lượt kế tiếp sau now; các lượt đã lỡ bị bỏ qua."""
+        if self.at:
+            self.due = self._next_at(now)
+        else:
+            self.due += self.interval
+            if self.due <= now:
+                self.due += ((now - self.due) // self.interval + 1) * self.interval
+        self.next_run = self.due + random.uniform(0, self.jitter)
+
+    def adapt(self, changed, now):
+        """Chỉnh chu kỳ theo số dòng đổi của lượt vừa xong và dời lần chạy tới theo chu kỳ mới."""
+        if changed is None or self.at or self.min_interval == self.max_interval:
+            return
+        old = self.interval
+        if changed == 0:
+            interval = old * ADAPT_GROW
+        elif changed >= self.busy_rows:
+            interval = old * ADAPT_SHRINK
+        else:
+            interval = (old + self.base_interval) / 2
+        self.interval = min(self.max_interval, max(self.min_interval, interval))
+        if abs(self.interval - old) < 1:
+            return
+        self.due = max(self.run_due + self.interval, now)
+        self.next_run = self.due + random.uniform(0, self.jitter)
+        print(f"[SCHEDULER] {self.name}: {changed} dòng đổi, chu kỳ {old:.0f}s -> {self.interval:.0f}s.")
+
+    def _next_at(self, now):
+        hour, minute = map(int, self.at.split(":"))
+        moment = datetime.fromtimestamp(now).replace(hour=hour, minute=minute, second=0, microsecond=0)
+        if moment.timestamp() <= now:
+            moment += timedelta(days=1)
+        return moment.timestamp()
+
+
+class Scheduler:
+    def __init__(self, jobs, max_concurrent=MAX_CONCURRENT_JOBS, report_seconds=REPORT_SECONDS):
+        self.jobs = list(jobs)
+        self.max_concurrent = max_concurrent
+        self.report_seconds = report_seconds
+        self._pool = ThreadPoolExecutor(max_workers=max_concurrent, thread_name_prefix="job")
+        self._tasks = set()
+
+    def report(self):
+        print(f"[SCHEDULER] {len(self.jobs)} job, tối đa {self.max_concurrent} job cùng lúc:")
+        for job in self.jobs:
+            state = "đang chạy" if job.running else ("lỗi: " + str(job.last_error)[:60] if job.last_error else "chờ")
+            duration = f"{job.last_duration:.1f}s" if job.last_duration is not None else "-"
+            cycle = f"{job.interval:.0f}s" if job.interval else job.at
+            print(
+                f"[SCHEDULER]   {job.name:<30} chu kỳ {cycle:>6}  lần tới {_fmt(job.next_run)}  lần trước {duration:>8}  "
+                f"chạy {job.runs}, bỏ lượt {job.skipped}, {state}"
+            )
+
+    def _group_busy(self, job):
+        """Group có job khác đang chạy, hoặc có job khác đã chờ group lâu hơn job này."""
+        if job.group is None:
+            return False
+        since = job.waiting_since or float("inf")
+        return any(
+            other.running or (other.waiting_since is not None and other.waiting_since < since)
+            for other in self.jobs if other is not job and other.group == job.group
+        )
+
+    async def _run(self, job, slots):
+        loop = asyncio.get_running_loop()
+        async with slots:
+            start = time.time()
+            try:
+                job.last_result = await loop.run_in_executor(self._pool, job.call)
+                job.last_error = None
+                job.adapt(job.last_result, time.time())
+            except Exception as e:
+                job.last_error = e
+                print(f"[SCHEDULER ERROR] {job.name}: {e}")
+            finally:
+                job.last_duration = time.time() - start
+                job.runs += 1
+                job.running = False
+        print(f"[SCHEDULER] {job.name} xong sau {job.last_duration:.1f}s. Lần tới: {_fmt(job.next_run)}")
+
+    async def serve(self):
+        slots = asyncio.Semaphore(self.max_concurrent)
+        now = time.time()
+        for job in self.jobs:
+            job.schedule_first(now)
+        self.report()
+        next_report = now + self.report_seconds
+
+        while True:
+            now = time.time()
+            for job in self.jobs:
+                if job.next_run > now:
+                    continue
+                if job.running:
+                    job.skipped += 1
+                    job.schedule_next(now)
+                    print(f"[SCHEDULER] {job.name} chưa xong lượt trước, bỏ lượt này. Lần tới: {_fmt(job.next_run)}")
+                    continue
+                if self._group_busy(job):
+                    job.waiting_since = job.waiting_since or now
+                    job.next_run = now + GROUP_RETRY_SECONDS
+                    continue
+                job.waiting_since = None
+                job.running = True
+                job.run_due = job.due
+                job.schedule_next(now)
+                task = asyncio.create_task(self._run(job, slots))
+                self._tasks.add(task)
+                task.add_done_callback(self._tasks.discard)
+
+            if now >= next_report:
+                self.report()
+                next_report = now + self.report_seconds
+            wake = min(min(job.next_run for job in self.jobs), next_report)
+            await asyncio.sleep(min(max(wake - time.time(), 0.05), 60))
+
+    def close(self):
+        # Job đang chạy là hàm đồng bộ, không huỷ giữa chừng được: để thread tự kết thúc
+        self._pool.shutdown(wait=False)
+
+
+def run_jobs(jobs, max_concurrent=MAX_CONCURRENT_JOBS):
+    """Chạy các job tới khi Ctrl+C."""
+    scheduler = Scheduler(jobs, max_concurrent)
+    try:
+        asyncio.run(scheduler.serve())
+    except KeyboardInterrupt:
+        print("\n[SCHEDULER] Dừng.")
+    finally:
+        scheduler.close()
+    return scheduler
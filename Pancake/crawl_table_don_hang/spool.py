@@ -0,0 +1,143 @@
+"""
+Spool cục bộ (SQLite) giữ dữ liệu đã crawl/transform khi Postgres hoặc MongoDB
+không kết nối được, để không mất dữ liệu của lượt đó và không phải gọi lại
+API Pancake / Google Sheets.
+
+- Mỗi mục là một lô đã sẵn sàng ghi, nén zlib, theo seq tăng dần. Batch COPY text
+  của Pancake được append() nối tiếp nhau; snapshot cả sheet thì replace() thay
+  snapshot cũ, mỗi sheet chỉ giữ bản mới nhất.
+  SQLite chạy WAL + synchronous=FULL nên mục đã append() không mất khi process chết.
+- Khi sink kết nối lại, pending() trả các mục theo đúng thứ tự seq; ghi xong
+  mục nào thì ack() mục đó. Ghi vào sink là idempotent (upsert theo fingerprint /
+  documentId), nên process chết giữa lúc ghi và ack thì ghi lại cũng không sao.
+- Bảng state giữ vài giá trị cần khi sink chết, ví dụ watermark cuối của từng bảng.
+"""
+import os
+import pickle
+import sqlite3
+import threading
+import time
+import zlib
+
+SPOOL_FILE = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "spool.sqlite3")
+
+_lock = threading.Lock()
+_conn = None
+
+
+def _db():
+    global _conn
+    if _conn is None:
+        _conn = sqlite3.connect(SPOOL_FILE, timeout=30, check_same_thread=False, isolation_level=None)
+        _conn.execute("PRAGMA journal_mode=WAL")
+        _conn.execute("PRAGMA synchronous=FULL")
+        _conn.execute("""
+            CREATE TABLE IF NOT EXISTS spool(
+                seq INTEGER PRIMARY KEY AUTOINCREMENT,
+                sink TEXT NOT NULL,
+                target TEXT NOT NULL,
+                payload BLOB NOT NULL,
+                created REAL NOT NULL
+            )
+        """)
+        _conn.execute("CREATE INDEX IF NOT EXISTS spool_target_idx ON spool (sink, target, seq)")
+        _conn.execute("CREATE TABLE IF NOT EXISTS state(key TEXT PRIMARY KEY, value TEXT)")
+    return _conn
+
+
+def append(sink, target, item):
+    """Ghi một lô (object pickle được) cho sink ("pg"/"mongo") và target (bảng/sheet)."""
+    payload = zlib.compress(pickle.dumps(item, protocol=pickle.HIGHEST_PROTOCOL), 6)
+    with _lock:
+        _db().execute(
+            "INSERT INTO spool (sink, target, payload, created) VALUES (?, ?, ?, ?)",
+            (sink, target, payload, time.time())
+        )
+    return len(payload)
+
+
+def replace(sink, target, item):
+    """Như append nhưng bỏ mọi mục cũ của target trong cùng transaction: target chỉ cần bản mới nhất."""
+    payload = zlib.compress(pickle.dumps(item, protocol=pickle.HIGHEST_PROTOCOL), 6)
+    with _lock:
+        db = _db()
+        db.execute("BEGIN IMMEDIATE")
+        try:
+            db.execute("DELETE FROM spool WHERE sink = ? AND target = ?", (sink, target))
+            db.execute(
+                "INSERT INTO spool (sink, target, payload, created) VALUES (?, ?, ?, ?)",
+                (sink, target, payload, time.time())
+            )
+            db.execute("COMMIT")
+        except BaseException:
+            db.execute("ROLLBACK")
+            raise
+    return len(payload)
+
+
+def pending(sink, target):
+    """Các mục chưa ghi của target theo thứ tự: [(seq, item)]. Đọc từng mục một, không giữ cả spool trong bộ nhớ."""
+    with _lock:
+        seqs = [row[0] for row in _db().execute(
+            "SELECT seq FROM spool WHERE sink = ? AND target = ? ORDER BY seq", (sink, target)
+        )]
+    for seq in seqs:
+        with _lock:
+            row = _db().execute("SELECT payload FROM spool WHERE seq = ?", (seq,)).fetchone()
+        if row is not None:
+            yield seq, pickle.loads(zlib.decompress(row[0]))
+
+
+def ack(seq):
+    with _lock:
+        _db().execute("DELETE FROM spool WHERE seq = ?", (seq,))
+
+
+def count(sink, target):
+    with _lock:
+        return _db().execute("SELECT count(*) FROM spool WHERE sink = ? AND target = ?", (sink, target)).fetchone()[0]
+
+
+def created(sink, target):
+    """Thời điểm (epoch) mục mới nhất của target được ghi vào spool, None nếu không có."""
+    with _lock:
+        return _db().execute(
+            "SELECT max(created) FROM spool WHERE sink = ? AND target = ?", (sink, target)
+        ).fetchone()[0]
+
+
+def clear(sink, target):
+    """Bỏ mọi mục của target (đã có bản mới hơn ghi thẳng vào sink). Trả về số mục đã bỏ."""
+    with _lock:
+        return _db().execute("DELETE FROM spool WHERE sink = ? AND target = ?", (sink, target)).rowcount
+
+
+def get_state(key):
+    with _lock:
+        row = _db().execute("SELECT value FROM state WHERE key = ?", (key,)).fetchone()
+    return row[0] if row else None
+
+
+def set_state(key, value):
+    with _lock:
+        _db().execute(
+            "INSERT INTO state (key, value) VALUES (?, ?) ON CONFLICT (key) DO UPDATE SET value = excluded.value",
+            (key, value)
+        )
+
+
+def replay(sink, target, write):
+    """
+    Ghi lại các mục của target theo thứ tự bằng write(item); ack từng mục sau khi ghi xong.
+    write raise hoặc trả về False thì dừng, các mục còn lại giữ cho lượt sau.
+    Trả về số mục đã ghi.
+    """
+    done = 0
+    for seq, item in pending(sink, target):
+        if write(item) is False:
+            break
+        ack(seq)
+        done += 1
+    if done:
+        print(f"[SPOOL] Đã ghi lại {done} lô từ spool vào {target}, còn {count(sink, target)} lô.")
+    return done
@@ -0,0 +1,109 @@
+"""
+Lượt quét id nhẹ để phát hiện đơn bị xoá trên Pancake.
+
+Crawl incremental chỉ thấy đơn vừa đổi, nên "id thấy trong lượt này = mọi đơn
+còn sống" không còn đúng. Lượt quét đi hết danh sách đơn theo cửa sổ tao_luc
+(planner.py, phân trang không xô lệch), mỗi trang chỉ decode id + updated_at
+(decode_ids), không map/fingerprint/ghi bảng đơn. Id của mỗi cửa sổ được COPY
+và commit ngay vào bảng phụ unlogged <table>_sweep (theo run_id), nên lượt quét
+dài không giữ transaction mở. Cuối lượt anti-join với bảng đơn trong một
+transaction ngắn (finish_sweep): đánh dấu/khôi phục is_deleted, và đơn có
+updated_at khác bản đã lưu thì lùi watermark để lượt incremental sau tải payload
+đầy đủ của riêng các đơn đó.
+Cửa sổ nào lỗi hoặc thiếu id so với số đã đếm thì cả lượt bị bỏ (abort_sweep), không xoá nhầm.
+"""
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from datetime import datetime, timezone
+
+from config.pancake_config.api_params import DEFAULT_PAGE_SIZE
+from crawl_table_don_hang.crawler import fetch_page_body
+from crawl_table_don_hang.decoding import decode_ids
+from crawl_table_don_hang.planner import plan_windows, history_ranges
+from crawl_table_don_hang.db import start_sweep, copy_sweep_ids, abort_sweep, finish_sweep
+
+
+def sweep_window(session, shop, window, page_size):
+    """id + updated_at của mọi đơn trong cửa sổ. Trả về (rows không trùng id, số byte tải, số request, complete)."""
+    start, end, expected = window
+    rows = {}
+    size = requests = 0
+    page = 1
+    while True:
+        body = fetch_page_body(session, shop, page, page_size, window=(start, end))
+        requests += 1
+        size += len(body)
+        page_rows, _ = decode_ids(body)
+        rows.update(page_rows)
+        if len(page_rows) < page_size:
+            break
+        page += 1
+    return list(rows.items()), size, requests, expected is None or len(rows) >= expected
+
+
+def sweep_shop(session, conn, shop, end=None):
+    """
+    Quét id một shop và cập nhật is_deleted. Trả về số đơn đổi trạng thái/cần tải lại
+    (để scheduler chỉnh chu kỳ), None nếu lượt quét không trọn vẹn.
+    """
+    tag = f"[{shop['name']}]"
+    table = shop["table"]
+    start_time = time.time()
+    run_id = int(start_time * 1000)
+    page_size = shop.get("page_size") or DEFAULT_PAGE_SIZE or 100
+    concurrency = max(1, shop.get("max_concurrency") or 1)
+    end = int(end or start_time)
+    stats = {"probes": 0}
+
+    windows = plan_windows(session, shop, history_ranges(end), concurrency=concurrency, stats=stats)
+    start_sweep(conn, table, run_id)
+    seen = size = requests = 0
+    complete = True
+    remaining = iter(windows)
+    running = {}
+    try:
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            def submit():
+                window = next(remaining, None)
+                if window is not None:
+                    running[pool.submit(sweep_window, session, shop, window, page_size)] = window
+
+            for _ in range(concurrency):
+                submit()
+            try:
+                while running and complete:
+                    done, _ = wait(running, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        window = running.pop(future)
+                        submit()
+                        try:
+                            rows, window_size, window_requests, ok = future.result()
+                        except RuntimeError as e:
+                            print(f"[ERROR] {tag} Quét id: {e}")
+                            complete = False
+                            break
+                        if not ok:
+                            print(f"[WARN] {tag} Quét id: cửa sổ lấy {len(rows)}/{window[2]} id.")
+                            complete = False
+                            break
+                        copy_sweep_ids(conn, table, run_id, rows)
+                        seen += len(rows)
+                        size += window_size
+                        requests += window_requests
+            finally:
+                for future in running:
+                    future.cancel()
+    except Exception:
+        abort_sweep(conn, table, run_id)
+        raise
+
+    if not complete:
+        abort_sweep(conn, table, run_id)
+        print(f"[SWEEP] {tag} Lượt quét id chưa trọn vẹn, không cập nhật is_deleted.")
+        return None
+    result = finish_sweep(conn, table, run_id, datetime.fromtimestamp(end, tz=timezone.utc), seen)
+    print(
+        f"[SWEEP] {tag} {seen} id, {len(windows)} cửa sổ, {stats['probes'] + requests} request, "
+        f"{size / 1e6:.1f} MB, {time.time() - start_time:.1f}s."
+    )
+    return sum(result) if result else None
@@ -0,0 +1,59 @@
+"""
+Làm mới đơn theo tầng, dựa trên trang_thai và tao_luc đã lưu trong bảng đơn của shop.
+
+- Tầng hot: đơn còn mở (trang_thai chưa kết thúc) hoặc tạo trong HOT_DAYS ngày
+  gần đây. Lượt "hot" crawl lại các cửa sổ tao_luc chứa những đơn này (planner.py):
+  cả HOT_DAYS ngày gần nhất, cộng các ngày cũ hơn còn đơn mở (ngày gần nhau gộp
+  thành một cửa sổ).
+- Tầng cold: đơn đã kết thúc và cũ (đã nhận/hoàn/huỷ/thu tiền từ lâu), gần như
+  không đổi nữa, chỉ được đọc lại trong lượt crawl full hằng đêm.
+Mỗi lượt in chi phí của tầng (số request, số đơn đọc, số đơn đổi, thời gian),
+lượt hot in thêm số đơn mỗi tầng trong DB.
+"""
+from datetime import datetime, timezone
+
+from crawl_table_don_hang.db import get_open_order_days, count_tiers
+
+# trang_thai của Pancake coi là kết thúc: 3 đã nhận, 5 đã hoàn, 6 đã huỷ, 7 đã xoá,
+# 15 hoàn một phần, 16 đã thu tiền
+TERMINAL_STATUSES = (3, 5, 6, 7, 15, 16)
+# Đơn tạo trong chừng này ngày luôn thuộc tầng hot; shop có thể đặt "hot_days"
+HOT_DAYS = 30
+# Các ngày còn đơn mở cách nhau không quá chừng này ngày được gộp một cửa sổ
+HOT_MERGE_DAYS = 3
+DAY = 86400
+
+
+def hot_ranges(conn, table, now, hot_days=HOT_DAYS):
+    """
+    Các khoảng tao_luc [(start, end)] (unix giây, không chồng nhau) chứa mọi đơn tầng hot,
+    và số đơn còn mở tạo trước HOT_DAYS ngày.
+    """
+    recent_start = int(now - hot_days * DAY)
+    days = get_open_order_days(
+        conn, table, datetime.fromtimestamp(recent_start, tz=timezone.utc), TERMINAL_STATUSES
+    )
+    ranges = []
+    for day, _ in days:
+        start = int(datetime(day.year, day.month, day.day, tzinfo=timezone.utc).timestamp())
+        end = min(start + DAY, recent_start)
+        if start >= end:
+            continue
+        if ranges and start - ranges[-1][1] <= HOT_MERGE_DAYS * DAY:
+            ranges[-1][1] = end
+        else:
+            ranges.append([start, end])
+    ranges.append([recent_start, int(now)])
+    return [tuple(r) for r in ranges], sum(n for _, n in days)
+
+
+def report_tier(tag, tier, seconds, read, changed, stats=None, conn=None, table=None, now=None, hot_days=HOT_DAYS):
+    """In chi phí của một lượt theo tầng; có conn thì in thêm số đơn mỗi tầng trong DB."""
+    cost = f"{read} đơn đọc, {changed} đơn đổi, {seconds:.1f}s"
+    if stats:
+        cost = f"{stats['windows']} cửa sổ, {stats['probes'] + stats['pages']} request, " + cost
+    print(f"[TIER] {tag} {tier}: {cost}.")
+    if conn is not None:
+        recent_start = datetime.fromtimestamp(now - hot_days * DAY, tz=timezone.utc)
+        hot, cold = count_tiers(conn, table, recent_start, TERMINAL_STATUSES)
+        print(f"[TIER] {tag} Trong DB: hot {hot} đơn (làm mới mỗi lượt hot), cold {cold} đơn (chỉ crawl full hằng đêm).")
@@ -0,0 +1,175 @@
+"""
+Quản lý access_token của Pancake cho mọi shop trong process.
+
+- Token hiện dùng được đọc từ file cache (TOKEN_CACHE_FILE) hoặc biến môi trường
+  PANCAKE_TOKEN; không có token còn hạn thì đăng nhập (PANCAKE_USER/PANCAKE_PASS).
+- Thread nền làm mới token trước `exp` TOKEN_REFRESH_BEFORE giây, nên crawl
+  không phải dừng lại chờ đăng nhập.
+- Token mới được ghi ra file cache (khoá file khi làm mới), nên lần chạy sau
+  và các process khác dùng lại cùng một lần đăng nhập thay vì tự login.
+- Request bị 401: invalidate_token(token) rồi thử lại một lần với token mới.
+Các hàm get_token_expiration / is_token_expired / refresh_token thay cho bản
+chép riêng trong crawl_logic.py của từng shop trước đây.
+"""
+import base64
+import json
+import os
+import threading
+import time
+
+import requests
+
+from config.pancake_config.api_params import LOGIN_URL, TOKEN_CACHE_FILE, TOKEN_REFRESH_BEFORE
+
+try:
+    from dotenv import load_dotenv
+    load_dotenv()
+except ImportError:
+    pass
+
+try:
+    import fcntl
+except ImportError:  # Windows: không khoá được giữa các process, vẫn khoá trong process
+    fcntl = None
+
+# Chờ bao lâu rồi thử lại khi làm mới token lỗi
+RETRY_SECONDS = 60
+
+_lock = threading.Lock()
+_token = None
+_refresher = None
+
+
+# ======= JWT =======
+def get_token_expiration(token: str) -> int:
+    """Trả về unix timestamp hết hạn của token JWT."""
+    try:
+        payload = token.split('.')[1]
+        padding = '=' * (-len(payload) % 4)
+        decoded = base64.urlsafe_b64decode(payload + padding)
+        exp = json.loads(decoded).get('exp', 0)
+        return exp
+    except Exception:
+        return 0
+
+
+def is_token_expired(token: str, buffer_seconds: int = 60) -> bool:
+    """Kiểm tra token đã hoặc sắp hết hạn (trước buffer giây)."""
+    exp = get_token_expiration(token)
+    return time.time() > (exp - buffer_seconds)
+
+
+def refresh_token() -> str:
+    """Gọi API login để lấy token mới."""
+    payload = {"email": os.getenv("PANCAKE_USER"), "password": os.getenv("PANCAKE_PASS")}
+    if not payload["email"] or not payload["password"]:
+        raise RuntimeError("Chưa cấu hình PANCAKE_USER/PANCAKE_PASS để đăng nhập lấy token.")
+    print("[TOKEN] Đang refresh token...")
+    r = requests.post(LOGIN_URL, json=payload, timeout=30)
+    r.raise_for_status()
+    token = r.json().get("access_token")
+    if not token:
+        raise RuntimeError("Không tìm thấy access_token trong response.")
+    print("[TOKEN] Refresh token thành công.")
+    return token
+
+
+# ======= Cache file =======
+def _read_cache():
+    try:
+        with open(TOKEN_CACHE_FILE, encoding="utf-8") as f:
+            return json.load(f).get("access_token")
+    except (OSError, ValueError):
+        return None
+
+
+def _write_cache(token):
+    tmp = f"{TOKEN_CACHE_FILE}.{os.getpid()}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump({"access_token": token, "exp": get_token_expiration(token)}, f)
+    os.replace(tmp, TOKEN_CACHE_FILE)
+
+
+class _FileLock:
+    """Khoá file cạnh TOKEN_CACHE_FILE để chỉ một process đăng nhập tại một thời điểm."""
+
+    def __enter__(self):
+        self.f = open(f"{TOKEN_CACHE_FILE}.lock", "w")
+        if fcntl is not None:
+            fcntl.flock(self.f, fcntl.LOCK_EX)
+        return self
+
+    def __exit__(self, *exc):
+        if fcntl is not None:
+            fcntl.flock(self.f, fcntl.LOCK_UN)
+        self.f.close()
+
+
+def _newest(*tokens):
+    tokens = [t for t in tokens if t]
+    return max(tokens, key=get_token_expiration) if tokens else None
+
+
+# ======= API =======
+def get_token():
+    """Token hợp lệ hiện tại; chỉ đăng nhập đồng bộ khi token đã thực sự hết hạn."""
+    global _token
+    token = _token
+    if token and not is_token_expired(token):
+        return token
+    with _lock:
+        _token = _newest(_token, _read_cache(), os.getenv("PANCAKE_TOKEN"))
+        if _token and not is_token_expired(_token):
+            return _token
+    return _refresh(_token)
+
+
+def invalidate_token(stale):
+    """Gọi khi request bị 401 với token `stale`: lấy token mới (trừ khi đã có thread khác làm)."""
+    return _refresh(stale)
+
+
+def _refresh(stale, before=0):
+    """Làm mới token nếu token hiện tại vẫn là `stale` hoặc còn dưới `before` giây."""
+    global _token
+    with _lock, _FileLock():
+        # Process/thread khác có thể vừa đăng nhập xong
+        current = _newest(_token, _read_cache())
+        if current and current != stale and not is_token_expired(current, before):
+            _token = current
+            return current
+        token = refresh_token()
+        _write_cache(token)
+        _token = token
+        return token
+
+
+def _refresh_loop(stop):
+    while True:
+        wait = get_token_expiration(_token or "") - TOKEN_REFRESH_BEFORE - time.time()
+        if wait > 0:
+            # Ngủ tối đa 1h rồi tính lại (token có thể vừa đổi do 401 hoặc process khác)
+            if stop.wait(min(wait, 3600)):
+                return
+            continue
+        try:
+            _refresh(_token, before=TOKEN_REFRESH_BEFORE)
+        except Exception as e:
+            print(f"[TOKEN ERROR] Không làm mới được token: {e}. Thử lại sau {RETRY_SECONDS}s.")
+            if stop.wait(RETRY_SECONDS):
+                return
+
+
+def start_token_refresher():
+    """Chạy thread nền làm mới token trước khi hết hạn. Trả về Event để dừng."""
+    global _refresher
+    with _lock:
+        if _refresher is not None:
+            return _refresher
+        _refresher = threading.Event()
+    try:
+        get_token()
+    except Exception as e:
+        print(f"[TOKEN ERROR] {e}")
+    threading.Thread(target=_refresh_loop, args=(_refresher,), name="token-refresher", daemon=True).start()
+    return _refresher
@@ -0,0 +1,161 @@
+"""
+Chuyển các bảng don_hang_<shop> cũ (thời gian/trạng thái dạng TEXT, tiền NUMERIC)
+sang schema có kiểu: TIMESTAMPTZ, BIGINT (VND), SMALLINT.
+
+Cách làm để không khoá bảng lâu:
+  1. Thêm cột mới <cột>__typed và trigger BEFORE INSERT OR UPDATE tính <cột>__typed
+     từ <cột> (cùng transaction), nên dòng run.py ghi/sửa trong lúc migrate luôn đúng.
+  2. Backfill theo lô BATCH_SIZE đơn (keyset theo order_id), commit sau mỗi lô.
+  3. Trong một transaction ngắn: LOCK bảng, bỏ trigger, DROP cột cũ, RENAME cột mới.
+Bảng con _items/_shipments nhỏ nên ALTER COLUMN TYPE trực tiếp.
+run.py chạy tiếp được trong lúc migrate; migrate bị dừng giữa chừng thì chạy lại.
+
+Chạy: python migrate_typed_schema.py [tên_shop ...]
+"""
+import sys
+import time
+
+from config.shops_config import SHOPS
+from crawl_table_don_hang.db import connection, create_table, create_child_tables
+from crawl_table_don_hang.processing_order import shop_columns
+
+BATCH_SIZE = 5000
+
+# Giá trị cũ: "2025/09/17 10:36:54" (giờ VN, từ format_any_datetime) hoặc chuỗi ISO có timezone
+_TS = (
+    "CASE WHEN NULLIF({c}, '') IS NULL THEN NULL "
+    "WHEN {c} ~ '^\\d{{4}}/' THEN to_timestamp({c}, 'YYYY/MM/DD HH24:MI:SS')::timestamp AT TIME ZONE 'Asia/Ho_Chi_Minh' "
+    "ELSE {c}::timestamptz END"
+)
+_INT = "CASE WHEN {c}::text ~ '^\\s*-?[0-9]+(\\.[0-9]+)?\\s*$' THEN round({c}::numeric)::bigint END"
+
+# cột -> (kiểu mới, biểu thức chuyển đổi từ giá trị cũ)
+TYPED_COLUMNS = {
+    "han_ban_giao_don": ("TIMESTAMPTZ", _TS),
+    "tao_luc": ("TIMESTAMPTZ", _TS),
+    "cap_nhat_tt": ("TIMESTAMPTZ", _TS),
+    "tong_tien": ("BIGINT", _INT),
+    "trang_thai": ("SMALLINT", _INT + "::smallint"),
+}
+CHILD_COLUMNS = {
+    "items": {"don_gia": "BIGINT", "giam_gia": "BIGINT"},
+    "shipments": {"tao_luc": "TIMESTAMPTZ", "phi_vc": "BIGINT"},
+}
+
+
+def column_types(conn, table):
+    with conn.cursor() as cur:
+        cur.execute(
+            "SELECT column_name, data_type FROM information_schema.columns WHERE table_name = %s",
+            (table,)
+        )
+        rows = cur.fetchall()
+        conn.commit()
+    return dict(rows)
+
+
+def pending_columns(conn, table):
+    """Các cột còn kiểu cũ (chưa migrate)."""
+    types = column_types(conn, table)
+    return [c for c, (new_type, _) in TYPED_COLUMNS.items()
+            if c in types and types[c] not in ("timestamp with time zone", "bigint", "smallint")]
+
+
+def _assignments(columns):
+    return ", ".join(f"{c}__typed = {TYPED_COLUMNS[c][1].format(c=c)}" for c in columns)
+
+
+def _sync_trigger_sql(table, columns):
+    """Hàm + trigger giữ <cột>__typed khớp <cột> cho mọi dòng được INSERT/UPDATE."""
+    body = "\n        ".join(f"NEW.{c}__typed := {TYPED_COLUMNS[c][1].format(c='NEW.' + c)};" for c in columns)
+    return f"""
+    CREATE OR REPLACE FUNCTION {table}_typed_sync() RETURNS trigger AS $$
+    BEGIN
+        {body}
+        RETURN NEW;
+    END
+    $$ LANGUAGE plpgsql;
+    DROP TRIGGER IF EXISTS {table}_typed_sync ON {table};
+    CREATE TRIGGER {table}_typed_sync BEFORE INSERT OR UPDATE ON {table}
+        FOR EACH ROW EXECUTE FUNCTION {table}_typed_sync();
+    """
+
+
+def migrate_table(conn, table, batch_size=BATCH_SIZE):
+    columns = pending_columns(conn, table)
+    if not columns:
+        print(f"[MIGRATE] {table}: đã đúng kiểu, bỏ qua.")
+        return
+    start = time.time()
+    print(f"[MIGRATE] {table}: chuyển {', '.join(columns)}.")
+
+    with conn.cursor() as cur:
+        for c in columns:
+            cur.execute(f"ALTER TABLE {table} ADD COLUMN IF NOT EXISTS {c}__typed {TYPED_COLUMNS[c][0]}")
+        # Từ đây dòng được ghi/sửa đã có giá trị mới; backfill lo các dòng có sẵn
+        cur.execute(_sync_trigger_sql(table, columns))
+        conn.commit()
+
+    # Backfill theo lô, mỗi lô một transaction
+    last_id = ""
+    done = 0
+    while True:
+        with conn.cursor() as cur:
+            cur.execute(
+                f"""
+                UPDATE {table} SET {_assignments(columns)}
+                WHERE order_id IN (
+                    SELECT order_id FROM {table} WHERE order_id > %s ORDER BY order_id LIMIT %s
+                )
+                RETURNING order_id
+                """,
+                (last_id, batch_size)
+            )
+            ids = [r[0] for r in cur.fetchall()]
+            conn.commit()
+        if not ids:
+            break
+        last_id = max(ids)
+        done += len(ids)
+        print(f"[MIGRATE] {table}: {done} dòng...")
+
+    # Đổi cột trong một transaction ngắn; dòng ghi trong lúc migrate đã được trigger cập nhật
+    with conn.cursor() as cur:
+        cur.execute(f"LOCK TABLE {table} IN ACCESS EXCLUSIVE MODE")
+        cur.execute(f"DROP TRIGGER IF EXISTS {table}_typed_sync ON {table}")
+        cur.execute(f"DROP FUNCTION IF EXISTS {table}_typed_sync()")
+        for c in columns:
+            cur.execute(f"ALTER TABLE {table} DROP COLUMN {c}")
+            cur.execute(f"ALTER TABLE {table} RENAME COLUMN {c}__typed TO {c}")
+        cur.execute(f"CREATE INDEX IF NOT EXISTS {table}_tao_luc_idx ON {table} (tao_luc)")
+        conn.commit()
+    print(f"[MIGRATE] {table}: xong {done} dòng trong {time.time() - start:.2f}s.")
+
+
+def migrate_child_tables(conn, table):
+    for suffix, columns in CHILD_COLUMNS.items():
+        child = f"{table}_{suffix}"
+        types = column_types(conn, child)
+        with conn.cursor() as cur:
+            for c, new_type in columns.items():
+                if types.get(c) in ("text", "numeric"):
+                    expr = (_TS if new_type == "TIMESTAMPTZ" else _INT).format(c=c)
+                    cur.execute(f"ALTER TABLE {child} ALTER COLUMN {c} TYPE {new_type} USING {expr}")
+                    print(f"[MIGRATE] {child}.{c} -> {new_type}")
+            conn.commit()
+
+
+def main(shops=None):
+    for shop in shops or SHOPS:
+        try:
+            with connection(shop["dbname"]) as conn:
+                create_table(conn, shop["table"], shop_columns(shop))
+                create_child_tables(conn, shop["table"])
+                migrate_table(conn, shop["table"])
+                migrate_child_tables(conn, shop["table"])
+        except Exception as e:
+            print(f"[MIGRATE ERROR] [{shop['name']}] {e}")
+
+
+if __name__ == "__main__":
+    main([s for s in SHOPS if s["name"] in sys.argv[1:]] or None)
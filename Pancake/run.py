@@ -0,0 +1,584 @@
+import json
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
+
+from psycopg2 import OperationalError, InterfaceError
+
+from config.shops_config import SHOPS
+from crawl_table_don_hang.crawler import make_client, iter_pages, crawl_batches, chain_pages, parse_updated_at
+from crawl_table_don_hang.pipeline import run_pipeline
+from crawl_table_don_hang.decoding import RAW_KEY, raw_payload
+from crawl_table_don_hang.datetimes import report_failures
+from crawl_table_don_hang.processing_order import (
+    process_orders, process_children, drop_unchanged, shop_columns, column_names
+)
+from crawl_table_don_hang import spool
+from crawl_table_don_hang.backfill import iter_backfill, encode_orders
+from crawl_table_don_hang.planner import iter_windows, history_ranges, WindowDone
+from crawl_table_don_hang.tiers import HOT_DAYS, hot_ranges, report_tier
+from crawl_table_don_hang.sweep import sweep_shop
+from crawl_table_don_hang.checkpoint import Checkpoint, to_unix, from_unix
+from crawl_table_don_hang.token_manager import start_token_refresher
+from crawl_table_don_hang.scheduler import Job, run_jobs
+from crawl_table_don_hang.db import (
+    connection,
+    close_pools,
+    create_table,
+    create_state_table,
+    create_checkpoint_table,
+    create_child_tables,
+    insert_on_conflict,
+    insert_copy,
+    create_raw_table,
+    archive_raw_orders,
+    archive_raw_copy,
+    get_fingerprints,
+    mark_seen,
+    update_is_deleted,
+    get_watermark,
+    save_watermark,
+)
+
+# Lùi watermark một khoảng để không sót đơn cập nhật sát thời điểm crawl trước
+WATERMARK_OVERLAP_MINUTES = 10
+# Số trang tối đa nằm chờ giữa các bước fetch -> transform -> upsert
+STREAM_QUEUE_SIZE = 2
+# Chu kỳ crawl incremental mặc định (giây), shop có thể đặt "interval" riêng.
+# Chu kỳ thích ứng theo số đơn đổi mỗi lượt, trong khoảng min_interval..max_interval
+SHOP_INTERVAL = 5 * 60
+SHOP_MIN_INTERVAL = 60
+SHOP_MAX_INTERVAL = 30 * 60
+# Crawl full mỗi đêm để cập nhật is_deleted (cũng là lượt duy nhất đọc lại tầng cold)
+FULL_CRAWL_AT = "02:00"
+# Làm mới tầng hot (đơn còn mở hoặc mới tạo, tiers.py), chu kỳ cũng thích ứng theo số đơn đổi
+HOT_INTERVAL = 15 * 60
+HOT_MIN_INTERVAL = 5 * 60
+HOT_MAX_INTERVAL = 2 * 60 * 60
+# Quét id phát hiện đơn bị xoá (sweep.py), shop có thể đặt "sweep_interval"
+SWEEP_INTERVAL = 6 * 60 * 60
+
+# Vài đơn mẫu của lượt crawl gần nhất mỗi shop (kiểm tra thuộc tính), không commit;
+# fixtures/ là dữ liệu cố định cho test và bench_*.py
+SAMPLES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "samples")
+
+# Một client (một connection pool HTTP, rate limit chung) cho cả process, đủ chỗ cho mọi shop.
+# Tạo lúc dùng lần đầu: process worker của backfill (spawn) import lại run.py mà không cần client
+_client = None
+_client_lock = threading.Lock()
+
+
+def get_client():
+    global _client
+    with _client_lock:
+        if _client is None:
+            _client = make_client(sum(s.get("max_concurrency", 1) for s in SHOPS))
+    return _client
+
+
+def close_client():
+    global _client
+    with _client_lock:
+        if _client is not None:
+            _client.close()
+            _client = None
+
+
+def save_sample_orders(orders, filename="out_put.json"):
+    if not orders:
+        print("[DEBUG] Không có order nào để ghi file.")
+        return
+    try:
+        # Ghi 3 đơn đầu tiên check cac thuộc tinh
+        sample = [{k: v for k, v in o.items() if k != RAW_KEY} for o in orders[:3]]
+        os.makedirs(os.path.dirname(os.path.abspath(filename)), exist_ok=True)
+        with open(filename, "w", encoding="utf-8") as f:
+            json.dump(sample, f, indent=2, ensure_ascii=False)
+        print(f"[DEBUG] Đã ghi {len(sample)} order mẫu vào {filename}")
+    except Exception as e:
+        print(f"[ERROR] Lỗi khi ghi file {filename}: {e}")
+
+
+# ========== SHOP ==========
+def transform_page(orders, lookup_conn, table, columns, archive_raw=False):
+    """
+    Một trang đơn thô -> (ids, records, items, shipments, raw_rows,
+    updated_at lớn nhất của trang, số đơn bỏ qua, updated_at nhỏ nhất của trang).
+    Đơn có fingerprint đã lưu trùng updated_at bị bỏ trước khi map.
+    raw_rows chỉ có khi archive_raw: (order_id, fingerprint, payload JSON) của các đơn đã đổi.
+    """
+    ids = [o.get("id") for o in orders]
+    changed = drop_unchanged(orders, get_fingerprints(lookup_conn, table, ids, archive_raw))
+    _, records = process_orders(changed, columns)
+    items, shipments = process_children(changed)
+    raw_rows = [
+        (o.get("id"), r["fingerprint"], raw_payload(o))
+        for o, r in zip(changed, records)
+    ] if archive_raw else []
+    seen = [t for t in (parse_updated_at(o) for o in orders) if t is not None]
+    return (
+        ids, records, items, shipments, raw_rows,
+        max(seen) if seen else None, len(orders) - len(changed), min(seen) if seen else None,
+    )
+
+
+class ShopRun:
+    """
+    Trạng thái chung của một lượt crawl một shop: kết nối, cột, số đếm, updated_at đã
+    thấy, checkpoint. transform / write_page / write_batch là bộ transform + ghi dùng
+    chung cho mọi chế độ (crawl_full, crawl_incremental, crawl_hot, crawl_backfill).
+    """
+
+    def __init__(self, shop, conn, lookup_conn, start):
+        self.shop = shop
+        self.tag = f"[{shop['name']}]"
+        self.table = shop["table"]
+        # conn: ghi (thread gọi); lookup_conn: đọc fingerprint ở bước transform
+        self.conn = conn
+        self.lookup_conn = lookup_conn
+        self.start = start
+        # updated_at của Pancake là UTC không timezone, như cột watermark
+        self.crawl_started = datetime.fromtimestamp(start, tz=timezone.utc).replace(tzinfo=None)
+        self.run_id = int(start * 1000)  # tăng dần giữa các lượt, khoá các id đã thấy trong <table>_seen
+        self.archive_raw = shop.get("archive_raw", False)
+        self.columns = shop_columns(shop)
+        self.names = column_names(self.columns)
+        self.sample_file = os.path.join(SAMPLES_DIR, f"{shop['name']}.json")
+        self.tier = None
+        self.record_seen = False  # lượt crawl full: ghi id đã thấy vào <table>_seen cho update_is_deleted
+        self.checkpoint = None
+        self.counts = {"seen": 0, "inserted": 0, "updated": 0, "skipped": 0}
+        self.newest = []
+        self.stats = {}
+        self._sampled = False
+
+    def transform(self, orders):
+        if isinstance(orders, WindowDone):
+            return orders
+        if not self._sampled:
+            save_sample_orders(orders, self.sample_file)
+            self._sampled = True
+        return transform_page(orders, self.lookup_conn, self.table, self.columns, self.archive_raw)
+
+    def write_page(self, page):
+        if isinstance(page, WindowDone):
+            self.checkpoint.window_done(page, self.counts["seen"])
+            return
+        page_ids, records, items, shipments, raw_rows, page_newest, skipped, page_oldest = page
+        inserted, updated = insert_on_conflict(self.conn, self.table, records, items, shipments, self.names)
+        archive_raw_orders(self.conn, self.table, raw_rows)
+        self.counts["inserted"] += inserted
+        self.counts["updated"] += updated
+        self.counts["skipped"] += skipped
+        mark_seen(self.conn, self.table, page_ids, self.run_id if self.record_seen else None)
+        self.counts["seen"] += len(page_ids)
+        if page_newest:
+            self.newest.append(page_newest)
+        if self.checkpoint is not None and self.checkpoint.kind == "incremental":
+            self.checkpoint.page_done(page_oldest)
+
+    def write_batch(self, batch):
+        """Ghi một batch COPY text của backfill.transform_body."""
+        inserted, updated = insert_copy(
+            self.conn, self.table, self.names, batch["records"], batch["count"], batch["items"], batch["shipments"]
+        )
+        archive_raw_copy(self.conn, self.table, batch["raw"])
+        self.counts["inserted"] += inserted
+        self.counts["updated"] += updated
+        mark_seen(self.conn, self.table, batch["ids"], self.run_id if self.record_seen else None)
+        self.counts["seen"] += len(batch["ids"])
+        if batch["newest"]:
+            self.newest.append(datetime.fromisoformat(batch["newest"]))
+
+    def stream(self, pages):
+        """pages -> transform -> write_page qua hàng đợi giới hạn. Trả về complete."""
+        return run_pipeline(pages, self.transform, self.write_page, STREAM_QUEUE_SIZE)
+
+    def crawl_pages(self, since, streaming=True):
+        """Phân trang offset (iter_pages) từ since (None: cả lịch sử); streaming=False thì gom hết rồi ghi một lần."""
+        if streaming:
+            return self.stream(iter_pages(get_client(), self.shop, page_size=None, since=since))
+        orders, complete = crawl_batches(get_client(), self.shop, page_size=None, since=since)
+        self.write_page(self.transform(orders))
+        return complete
+
+    def update_is_deleted(self, complete):
+        # Chỉ crawl full trọn vẹn mới biết đơn nào không còn trên Pancake
+        if complete:
+            seen = self.counts["seen"] + (self.checkpoint.state.get("seen_before", 0) if self.checkpoint else 0)
+            # Mốc cuối của lượt (end của checkpoint khi chạy tiếp): đơn tạo sau đó lượt này không đi qua
+            end = self.checkpoint.state["end"] if self.checkpoint else self.start
+            update_is_deleted(self.conn, self.table, self.run_id, seen, datetime.fromtimestamp(end, tz=timezone.utc))
+
+    def close_checkpoint(self, complete):
+        if self.checkpoint is None:
+            return
+        if complete:
+            self.checkpoint.clear()
+        else:
+            print(f"[CHECKPOINT] {self.tag} Giữ checkpoint {self.checkpoint.kind}, lượt sau chạy tiếp từ chỗ dừng.")
+
+    def save_watermark(self, complete):
+        if complete and self.newest:
+            # Đơn đổi trong lúc crawl có thể bị trang/cửa sổ đã qua bỏ lỡ: watermark không vượt lúc bắt đầu
+            keep_watermark(self.conn, self.table, min(max(self.newest), self.crawl_started))
+        elif not complete:
+            print(f"[CRAWL] {self.tag} Crawl chưa trọn vẹn, giữ nguyên watermark.")
+
+
+def crawl_full(run, windowed=True, streaming=True, checkpoint=None):
+    """
+    Crawl full (tầng cold) và cập nhật is_deleted.
+    windowed: theo cửa sổ thời gian song song (planner.py), checkpoint sau mỗi cửa sổ;
+    checkpoint: lượt full dở dang cần chạy tiếp (cùng run_id, chỉ các cửa sổ còn lại).
+    Không windowed: phân trang offset trên cả lịch sử.
+    """
+    run.tier = "cold (crawl full)"
+    run.record_seen = True
+    if checkpoint is not None:
+        run.run_id = checkpoint.run_id
+        run.crawl_started = from_unix(checkpoint.state["end"])
+        checkpoint.state["seen_before"] = checkpoint.state.get("seen", 0)
+        print(f"[CRAWL] {run.tag} Chế độ full (chạy tiếp checkpoint, {len(checkpoint.state['done'])} cửa sổ đã xong).")
+    else:
+        print(f"[CRAWL] {run.tag} Chế độ full.")
+        if windowed:
+            checkpoint = Checkpoint.start(
+                run.conn, run.table, "full", run.run_id,
+                {"started": run.start, "end": int(run.start), "done": [], "seen": 0},
+            )
+    run.checkpoint = checkpoint
+
+    if checkpoint is not None:
+        end = checkpoint.state["end"]
+        complete = run.stream(iter_windows(
+            get_client(), run.shop, end=end, ranges=checkpoint.remaining(history_ranges(end)),
+            stats=run.stats, mark_done=True,
+        ))
+    else:
+        complete = run.crawl_pages(None, streaming)
+    run.update_is_deleted(complete)
+    run.close_checkpoint(complete)
+    run.save_watermark(complete)
+    return complete
+
+
+def crawl_incremental(run, since, streaming=True):
+    """
+    Crawl các đơn đổi sau since (updated_at giảm dần). streaming: checkpoint sau mỗi trang;
+    lượt dở dang được chạy tiếp: đơn đổi sau khi lượt đó bắt đầu, rồi phần [since, low]
+    lượt đó chưa tới.
+    """
+    run.tier = "incremental"
+    resume = False
+    if streaming:
+        checkpoint = Checkpoint.load(run.conn, run.table, "incremental", run.start)
+        resume = checkpoint is not None and checkpoint.state.get("low") is not None
+        if not resume:  # chưa có trang nào được ghi: làm lại như lượt mới
+            checkpoint = Checkpoint.start(
+                run.conn, run.table, "incremental", run.run_id,
+                {"started": run.start, "since": since.isoformat(), "low": None},
+            )
+        run.checkpoint = checkpoint
+    print(f"[CRAWL] {run.tag} Chế độ incremental từ {since}" + (", chạy tiếp checkpoint." if resume else "."))
+
+    if resume:
+        state = run.checkpoint.state
+        cp_since = datetime.fromisoformat(state["since"])
+        low = datetime.fromisoformat(state["low"])
+        overlap = timedelta(minutes=WATERMARK_OVERLAP_MINUTES)
+        complete = run.stream(chain_pages(
+            iter_pages(get_client(), run.shop, page_size=None, since=from_unix(state["started"]) - overlap),
+            iter_pages(
+                get_client(), run.shop, page_size=None, since=cp_since,
+                window=(int(to_unix(cp_since)), int(to_unix(low)) + 1),
+            ),
+        ))
+    else:
+        complete = run.crawl_pages(since, streaming)
+    run.close_checkpoint(complete)
+    run.save_watermark(complete)
+    return complete
+
+
+def crawl_hot(run, hot_days=HOT_DAYS):
+    """
+    Crawl lại các cửa sổ tao_luc chứa đơn tầng hot (tiers.py). Chỉ một phần lịch sử:
+    không dời watermark, không đụng is_deleted, không checkpoint.
+    """
+    run.tier = "hot"
+    print(f"[CRAWL] {run.tag} Chế độ tầng hot.")
+    ranges, open_old = hot_ranges(run.conn, run.table, run.start, hot_days)
+    print(f"[TIER] {run.tag} Tầng hot: {len(ranges)} khoảng tao_luc, {open_old} đơn còn mở cũ hơn {hot_days} ngày.")
+    return run.stream(iter_windows(get_client(), run.shop, end=run.start, ranges=ranges, stats=run.stats))
+
+
+def crawl_backfill(run):
+    """Crawl full, decode + map trên nhiều process (backfill.py), rồi cập nhật is_deleted như crawl_full."""
+    run.tier = "cold (crawl full)"
+    run.record_seen = True
+    print(f"[CRAWL] {run.tag} Chế độ full (backfill).")
+    batches = iter_backfill(get_client(), run.shop, run.columns)
+    complete = run_pipeline(batches, lambda batch: batch, run.write_batch, STREAM_QUEUE_SIZE)
+    run.update_is_deleted(complete)
+    run.save_watermark(complete)
+    return complete
+
+
+def run_shop(shop, incremental=True, streaming=True, backfill=False, tier=None):
+    """
+    Crawl & cập nhật một shop.
+    incremental=True: chỉ lấy các đơn thay đổi kể từ watermark lần chạy trước
+    (lần đầu chưa có watermark thì tự crawl full). incremental=False: crawl full
+    và cập nhật is_deleted.
+    streaming=True: mỗi trang đi thẳng fetch -> transform -> upsert qua hàng đợi
+    giới hạn, bộ nhớ chỉ phụ thuộc page_size. streaming=False: gom hết rồi ghi một lần.
+    backfill=True: crawl full, decode + map trên nhiều process (backfill.py).
+    Crawl full (streaming) đi theo cửa sổ thời gian song song (planner.py), trừ khi
+    shop đặt "windowed": False.
+    tier="hot": chỉ crawl lại các cửa sổ tao_luc chứa đơn tầng hot (tiers.py),
+    không đụng watermark/is_deleted.
+    Crawl full theo cửa sổ và incremental (streaming) lưu checkpoint sau mỗi
+    cửa sổ/trang đã commit (checkpoint.py); lượt bị dừng giữa chừng được lượt
+    sau chạy tiếp (lượt full dở dang được chạy tiếp kể cả khi lượt sau là job incremental).
+    Postgres không kết nối được: lượt incremental được crawl vào spool cục bộ
+    (spool_shop), lượt sau kết nối được ghi lại spool trước khi crawl.
+    Trả về số đơn insert + update (None nếu lỗi) để scheduler chỉnh chu kỳ.
+    """
+    start = time.time()
+    tag = f"[{shop['name']}]"
+    hot_days = shop.get("hot_days", HOT_DAYS)
+    connected = False
+    try:
+        with connection(shop["dbname"]) as conn, connection(shop["dbname"]) as lookup_conn:
+            run = ShopRun(shop, conn, lookup_conn, start)
+            table = run.table
+            create_table(conn, table, run.columns)
+            create_child_tables(conn, table)
+            create_state_table(conn)
+            create_checkpoint_table(conn)
+            if run.archive_raw:
+                create_raw_table(conn, table)
+            # Các lượt giữ trong spool lúc Postgres chết phải ghi trước, theo thứ tự
+            replay_spool(conn, table)
+            connected = True
+
+            windowed = streaming and shop.get("windowed", True)
+            # Lượt crawl full dở dang được chạy tiếp trước mọi thứ khác
+            checkpoint = Checkpoint.load(conn, table, "full", start) if windowed and tier is None and not backfill else None
+            if checkpoint is not None:
+                crawl_full(run, checkpoint=checkpoint)
+            elif tier == "hot":
+                crawl_hot(run, hot_days)
+            elif backfill:
+                crawl_backfill(run)
+            else:
+                watermark = get_watermark(conn, table) if incremental else None
+                if watermark:
+                    remember_watermark(table, watermark, exact=True)
+                    crawl_incremental(run, watermark - timedelta(minutes=WATERMARK_OVERLAP_MINUTES), streaming)
+                else:
+                    crawl_full(run, windowed, streaming)
+
+            counts = run.counts
+            report_tier(
+                tag, run.tier, time.time() - start, counts["seen"], counts["inserted"] + counts["updated"],
+                run.stats, conn if run.tier == "hot" else None, table, start, hot_days,
+            )
+        print(
+            f"[DONE] {tag} Crawl & Update xong {counts['seen']} đơn hàng "
+            f"(insert {counts['inserted']}, update {counts['updated']}, bỏ qua không đổi {counts['skipped']}). "
+            f"Thời gian: {time.time() - start:.2f}s"
+        )
+        report_failures(tag)
+        return counts["inserted"] + counts["updated"]
+    except (OperationalError, InterfaceError) as e:
+        if connected or not incremental or backfill or tier is not None:
+            print(f"[MAIN ERROR] {tag} {e}")
+            return None
+        return spool_shop(shop, e)
+    except Exception as e:
+        print(f"[MAIN ERROR] {tag} {e}")
+        return None
+
+
+def remember_watermark(table, watermark, exact=False):
+    """
+    Nhớ watermark cục bộ (spool.py) để spool_shop biết crawl từ đâu khi Postgres chết.
+    Mặc định chỉ tiến; exact=True ghi đúng giá trị vừa đọc từ Postgres, kể cả khi đã bị
+    lùi (finish_sweep lùi watermark để tải lại đơn cũ).
+    """
+    key = f"watermark:{table}"
+    saved = spool.get_state(key)
+    if exact or saved is None or datetime.fromisoformat(saved) < watermark:
+        spool.set_state(key, watermark.isoformat())
+
+
+def keep_watermark(conn, table, watermark):
+    save_watermark(conn, table, watermark)
+    remember_watermark(table, watermark)
+
+
+def replay_spool(conn, table):
+    """Ghi các lô spool_shop đã giữ (insert_copy như backfill) và watermark của chúng, theo thứ tự."""
+    def write(entry):
+        if entry["kind"] == "watermark":
+            keep_watermark(conn, table, datetime.fromisoformat(entry["watermark"]))
+            return
+        batch = entry["batch"]
+        insert_copy(
+            conn, table, entry["names"], batch["records"], batch["count"], batch["items"], batch["shipments"]
+        )
+        archive_raw_copy(conn, table, batch["raw"])
+        mark_seen(conn, table, batch["ids"])
+
+    return spool.replay("pg", table, write)
+
+
+def spool_shop(shop, error):
+    """
+    Lượt incremental khi Postgres không kết nối được: crawl từ watermark đã nhớ cục bộ,
+    transform thành batch COPY text (encode_orders) rồi giữ từng trang vào spool.
+    Crawl trọn vẹn thì giữ thêm watermark mới, ghi vào Postgres sau cùng các batch.
+    Chưa có watermark cục bộ thì bỏ lượt (không crawl full khi không ghi được).
+    Trả về số đơn đã giữ, None nếu không giữ được gì.
+    """
+    start = time.time()
+    crawl_started = datetime.fromtimestamp(start, tz=timezone.utc).replace(tzinfo=None)
+    run_id = int(start * 1000)
+    tag = f"[{shop['name']}]"
+    table = shop["table"]
+    saved = spool.get_state(f"watermark:{table}")
+    if saved is None:
+        print(f"[SPOOL] {tag} Postgres không kết nối được ({error}), chưa có watermark cục bộ: bỏ lượt này.")
+        return None
+    since = datetime.fromisoformat(saved) - timedelta(minutes=WATERMARK_OVERLAP_MINUTES)
+    print(f"[SPOOL] {tag} Postgres không kết nối được ({error}), crawl incremental từ {since} vào spool.")
+
+    columns = shop_columns(shop)
+    names = column_names(columns)
+    archive_raw = shop.get("archive_raw", False)
+    counts = {"orders": 0, "size": 0}
+    newest = []
+
+    def write(batch):
+        counts["size"] += spool.append("pg", table, {"kind": "batch", "run_id": run_id, "names": names, "batch": batch})
+        counts["orders"] += batch["count"]
+        if batch["newest"]:
+            newest.append(datetime.fromisoformat(batch["newest"]))
+
+    try:
+        pages = iter_pages(get_client(), shop, page_size=None, since=since)
+        complete = run_pipeline(
+            pages, lambda orders: encode_orders(orders, columns, archive_raw), write, STREAM_QUEUE_SIZE
+        )
+    except Exception as e:
+        print(f"[MAIN ERROR] {tag} Spool: {e}")
+        complete = False
+    if complete and newest:
+        watermark = min(max(newest), crawl_started)
+        spool.append("pg", table, {"kind": "watermark", "watermark": watermark.isoformat()})
+        remember_watermark(table, watermark)
+    elif not complete:
+        print(f"[CRAWL] {tag} Crawl chưa trọn vẹn, giữ nguyên watermark.")
+    print(
+        f"[SPOOL] {tag} Giữ {counts['orders']} đơn ({counts['size'] / 1e6:.1f} MB nén), "
+        f"{spool.count('pg', table)} lô chờ ghi. Thời gian: {time.time() - start:.2f}s"
+    )
+    return counts["orders"] if counts["orders"] or complete else None
+
+
+def run_sweep(shop):
+    """Quét id một shop để cập nhật is_deleted (sweep.py). Trả về số đơn đổi trạng thái, None nếu lỗi."""
+    tag = f"[{shop['name']}]"
+    try:
+        with connection(shop["dbname"]) as conn:
+            create_state_table(conn)
+            # Watermark của các lượt trong spool phải ghi trước, không thì đè mất phần lùi của lượt quét
+            replay_spool(conn, shop["table"])
+            result = sweep_shop(get_client(), conn, shop)
+            watermark = get_watermark(conn, shop["table"])
+            if watermark:
+                remember_watermark(shop["table"], watermark, exact=True)
+            return result
+    except Exception as e:
+        print(f"[MAIN ERROR] {tag} Quét id: {e}")
+        return None
+
+
+# ========== MAIN ==========
+def main(incremental=True, shops=None, backfill=False):
+    """
+    Crawl song song tất cả shop trong shops_config (mỗi shop một thread).
+    backfill=True: lần lượt từng shop, mỗi shop dùng hết các core để map.
+    """
+    shops = shops or SHOPS
+    start = time.time()
+    if backfill:
+        for shop in shops:
+            run_shop(shop, incremental=False, backfill=True)
+    else:
+        with ThreadPoolExecutor(max_workers=len(shops)) as pool:
+            list(pool.map(lambda shop: run_shop(shop, incremental), shops))
+    report_failures()
+    print(f"[DONE] {len(shops)} shop. Tổng thời gian: {time.time() - start:.2f}s")
+
+
+def shop_jobs(shops=None):
+    """
+    Mỗi shop bốn job cùng group: incremental theo chu kỳ, làm mới tầng hot theo
+    HOT_INTERVAL, quét id phát hiện đơn bị xoá theo SWEEP_INTERVAL và crawl full
+    (tầng cold, is_deleted) lúc FULL_CRAWL_AT.
+    Chỉ incremental chạy ngay khi khởi động; lượt đầu của hot và quét id rải ngẫu nhiên
+    trong chu kỳ đầu để khởi động lại process không quét lại mọi shop cùng lúc.
+    """
+    jobs = []
+    for shop in shops or SHOPS:
+        jobs.append(Job(
+            shop["name"], run_shop, shop.get("interval", SHOP_INTERVAL), group=shop["name"], args=(shop,),
+            min_interval=shop.get("min_interval", SHOP_MIN_INTERVAL),
+            max_interval=shop.get("max_interval", SHOP_MAX_INTERVAL),
+        ))
+        jobs.append(Job(
+            f"{shop['name']} (hot)", run_shop, HOT_INTERVAL, group=shop["name"],
+            args=(shop,), kwargs={"tier": "hot"}, min_interval=HOT_MIN_INTERVAL, max_interval=HOT_MAX_INTERVAL,
+            stagger=True,
+        ))
+        jobs.append(Job(
+            f"{shop['name']} (sweep)", run_sweep, shop.get("sweep_interval", SWEEP_INTERVAL),
+            group=shop["name"], args=(shop,), stagger=True,
+        ))
+        jobs.append(Job(
+            f"{shop['name']} (full)", run_shop, at=FULL_CRAWL_AT, group=shop["name"],
+            args=(shop,), kwargs={"incremental": False},
+        ))
+    return jobs
+
+
+def run_scheduler(shops=None, extra_jobs=()):
+    """Chạy các job của shop (và extra_jobs) trên scheduler asyncio tới khi Ctrl+C."""
+    print(f"[Scheduler] Crawl incremental mỗi shop theo chu kỳ riêng, crawl full lúc {FULL_CRAWL_AT}. Nhấn Ctrl+C để dừng.")
+    try:
+        run_jobs(shop_jobs(shops) + list(extra_jobs))
+    finally:
+        close_pools()
+        close_client()
+
+
+if __name__ == "__main__":
+    # python run.py [tên_shop ...] để chỉ chạy một vài shop
+    # python run.py --backfill [tên_shop ...] để nạp/map lại toàn bộ lịch sử rồi thoát
+    selected = [s for s in SHOPS if s["name"] in sys.argv[1:]] or None
+    start_token_refresher()
+    if "--backfill" in sys.argv:
+        try:
+            main(shops=selected, backfill=True)
+        finally:
+            close_pools()
+            close_client()
+    else:
+        # Lượt incremental đầu của mỗi shop chạy ngay khi scheduler khởi động
+        run_scheduler(shops=selected)
@@ -0,0 +1,107 @@
+"""
+Chạy mọi job đồng bộ trong một process, một event loop (crawl_table_don_hang/scheduler.py):
+- crawl incremental/full của từng shop Pancake (run.shop_jobs)
+- đồng bộ Google Sheet -> MongoDB của các script trong Form_nhap, Quan_ly_tho, Dang_ki_chi
+
+Các script sheet được import lúc job chạy lần đầu (mỗi script tự tạo client
+gspread khi import), script lỗi chỉ làm hỏng job của nó.
+MongoDB không kết nối được thì snapshot sheet mới nhất được giữ trong spool cục bộ
+(crawl_table_don_hang/spool.py), dùng khi MongoDB lên lại mà đọc sheet lỗi.
+Chạy: python run_all.py (từ thư mục Pancake)
+"""
+import importlib
+import os
+import sys
+import time
+
+from pymongo import MongoClient
+from pymongo.errors import PyMongoError
+
+from crawl_table_don_hang import spool
+from crawl_table_don_hang.token_manager import start_token_refresher
+from crawl_table_don_hang.scheduler import Job
+from run import run_scheduler
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+# MongoDB mà các script sheet ghi vào, chỉ dùng để kiểm tra trước mỗi lượt
+MONGO_URI = "mongodb://localhost:27017/"
+SHEET_INTERVAL = 5 * 60
+# Chu kỳ thích ứng theo số document tạo/cập nhật mỗi lượt (update_database trả về)
+SHEET_MIN_INTERVAL = 2 * 60
+SHEET_MAX_INTERVAL = 30 * 60
+# Sheet nhỏ: đổi từ chừng này document trong một lượt là đang bận
+SHEET_BUSY_ROWS = 10
+# MongoDB chết: snapshot trong spool mới hơn chừng này thì không đọc lại Google Sheets
+SHEET_SPOOL_REFRESH = SHEET_MAX_INTERVAL
+
+# (thư mục, module, chu kỳ giây)
+SHEET_JOBS = [
+    ("Form_nhap", "Thong_tin_sales", SHEET_INTERVAL),
+    ("Form_nhap", "Thong_tin_vat_tu", SHEET_INTERVAL),
+    ("Quan_ly_tho", "don_tho", SHEET_INTERVAL),
+    ("Quan_ly_tho", "don_tho_chi_tiet", SHEET_INTERVAL),
+    ("Quan_ly_tho", "chi_phi_chi_tiet", SHEET_INTERVAL),
+    ("Dang_ki_chi", "dang_ki_chi", SHEET_INTERVAL),
+]
+
+
+def mongo_available():
+    client = MongoClient(MONGO_URI, serverSelectionTimeoutMS=5000)
+    try:
+        client.admin.command("ping")
+        return True
+    except PyMongoError:
+        return False
+    finally:
+        client.close()
+
+
+def sync_sheet(folder, module):
+    """
+    Đồng bộ một sheet. update_database ghi cả sheet nên bản mới nhất thay được mọi bản cũ:
+    - MongoDB chết: giữ snapshot sheet vào spool (thay snapshot cũ). Snapshot đang giữ còn
+      mới hơn SHEET_SPOOL_REFRESH thì không đọc lại Google Sheets.
+    - MongoDB sống: đồng bộ như thường rồi bỏ snapshot trong spool (đã cũ); đồng bộ lỗi
+      (ví dụ Google Sheets lỗi) thì ghi snapshot trong spool thay.
+    """
+    path = os.path.join(ROOT, folder)
+    if path not in sys.path:
+        sys.path.append(path)
+    sheet = importlib.import_module(module)
+    target = f"{folder}/{module}"
+    if not mongo_available():
+        spooled = spool.created("mongo", target)
+        if spooled is not None and time.time() - spooled < SHEET_SPOOL_REFRESH:
+            print(
+                f"[SPOOL] {target}: MongoDB vẫn chưa kết nối được, đã giữ snapshot "
+                f"{(time.time() - spooled) / 60:.0f} phút trước, chưa đọc lại sheet."
+            )
+            return None
+        data = sheet.get_json_data()
+        size = spool.replace("mongo", target, data)
+        print(f"[SPOOL] {target}: MongoDB không kết nối được, giữ snapshot {len(data)} document vào spool ({size / 1e3:.0f} KB).")
+        return None
+
+    result = sheet.update_database()
+    if result is not None:
+        if spool.clear("mongo", target):
+            print(f"[SPOOL] {target}: Đã đồng bộ bản mới, bỏ snapshot cũ trong spool.")
+        return result
+    # update_database trả về None khi lỗi: snapshot giữ lúc MongoDB chết vẫn mới hơn dữ liệu trong MongoDB
+    spool.replay("mongo", target, lambda data: sheet.update_database(data) is not None)
+    return None
+
+
+def sheet_jobs():
+    return [
+        Job(
+            f"{folder}/{module}", sync_sheet, interval, args=(folder, module),
+            min_interval=SHEET_MIN_INTERVAL, max_interval=SHEET_MAX_INTERVAL, busy_rows=SHEET_BUSY_ROWS,
+        )
+        for folder, module, interval in SHEET_JOBS
+    ]
+
+
+if __name__ == "__main__":
+    start_token_refresher()
+    run_scheduler(extra_jobs=sheet_jobs())
@@ -0,0 +1,5 @@
+import os
+import sys
+
+# Test import module như các script chạy từ thư mục Pancake
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
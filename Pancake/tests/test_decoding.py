@@ -0,0 +1,36 @@
+import json
+
+import pytest
+
+from crawl_table_don_hang import decoding
+from crawl_table_don_hang.processing_order import process_orders
+
+ORDER = {
+    "id": 1, "display_id": 1, "status": 1, "total_price": "100000",
+    "inserted_at": "2025-09-17T03:36:54", "updated_at": "2025-09-17T03:40:00",
+    "additional_info": {"delivery_deadline": "2025-09-20T00:00:00"},
+}
+
+
+def page_body(*additional_infos):
+    orders = [dict(ORDER, id=i + 1, additional_info=info) for i, info in enumerate(additional_infos)]
+    return json.dumps({"data": orders, "total_pages": 1, "total_entries": len(orders)}).encode()
+
+
+@pytest.mark.parametrize("keep_raw", [False, True])
+@pytest.mark.parametrize("bad", [[], "", 0, None])
+def test_decode_page_accepts_malformed_additional_info(keep_raw, bad):
+    body = page_body(ORDER["additional_info"], bad)
+    orders = decoding.decode_page(body, keep_raw=keep_raw)["data"]
+    assert [o["id"] for o in orders] == [1, 2]
+
+    _, records = process_orders(orders)
+    assert records[0]["han_ban_giao_don"] is not None
+    assert records[1]["han_ban_giao_don"] is None
+
+
+def test_decode_page_malformed_additional_info_without_msgspec(monkeypatch):
+    monkeypatch.setattr(decoding, "msgspec", None)
+    orders = decoding.decode_page(page_body([], "x"))["data"]
+    _, records = process_orders(orders)
+    assert [r["han_ban_giao_don"] for r in records] == [None, None]
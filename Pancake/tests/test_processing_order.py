@@ -0,0 +1,31 @@
+import pytest
+
+from crawl_table_don_hang.processing_order import ORDER_COLUMNS, process_children
+
+# Cùng một đơn xuất hiện hai lần trong một lô (trang offset bị xô): bản sau ít item hơn
+FIRST = {
+    "id": 1, "updated_at": "2025-09-17T03:36:54",
+    "items": [{"id": "a", "quantity": 1}, {"id": "b", "quantity": 2}, {"id": "c", "quantity": 3}],
+    "shipments": [{"tracking_code": "T1"}],
+}
+LAST = dict(FIRST, updated_at="2025-09-17T03:40:00", items=[{"id": "a", "quantity": 5}], shipments=[])
+OTHER = {"id": 2, "items": [{"id": "x", "quantity": 1}]}
+
+
+def test_process_children_keeps_last_copy_of_duplicate_order():
+    items, shipments = process_children([FIRST, OTHER, LAST])
+    keys = [(row[0], row[1]) for row in items]
+    assert len(keys) == len(set(keys))
+    assert [(row[0], row[2], row[7]) for row in items] == [(1, "a", 5), (2, "x", 1)]
+    assert shipments == []
+
+
+def test_encode_orders_keeps_last_copy_of_duplicate_order():
+    pytest.importorskip("requests")
+    from crawl_table_don_hang.backfill import encode_orders
+
+    batch = encode_orders([FIRST, OTHER, LAST], ORDER_COLUMNS)
+    assert batch["count"] == 2
+    items = [line.split("\t") for line in batch["items"].splitlines()]
+    assert [(row[0], row[1], row[2], row[7]) for row in items] == [("1", "0", "a", "5"), ("2", "0", "x", "1")]
+    assert batch["shipments"] == ""
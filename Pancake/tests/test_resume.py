@@ -0,0 +1,204 @@
+"""
+Lượt crawl bị dừng giữa chừng được lượt sau chạy tiếp từ checkpoint, trên API Pancake
+giả (lọc startDateTime/endDateTime theo updateStatus) và Postgres giả trong bộ nhớ.
+"""
+import contextlib
+import copy
+import json
+import random
+import time
+from datetime import datetime, timezone
+
+import pytest
+
+pytest.importorskip("psycopg2")
+pytest.importorskip("requests")
+
+import run
+from crawl_table_don_hang import checkpoint as cpm, crawler, spool
+
+T0 = 1500000000
+SHOP = {"name": "x", "table": "t", "dbname": "d", "shop_id": 1, "page_size": 1000}
+
+
+def iso(ts):
+    return datetime.fromtimestamp(ts, timezone.utc).replace(tzinfo=None).isoformat()
+
+
+def unix(value):
+    return datetime.fromisoformat(value).replace(tzinfo=timezone.utc).timestamp()
+
+
+class Resp:
+    status_code = 200
+    text = ""
+
+    def __init__(self, body):
+        self.content = body
+
+    def close(self):
+        pass
+
+
+class FakePancake:
+    """get_orders giả: lọc theo inserted_at/updated_at, sắp giảm dần; fail_after request thì raise."""
+
+    def __init__(self, orders):
+        self.orders = orders
+        self.fail_after = None
+        self.calls = 0
+
+    def post(self, url, params=None, **kw):
+        self.calls += 1
+        if self.fail_after is not None and params["page_size"] > 1:
+            self.fail_after -= 1
+            if self.fail_after < 0:
+                raise RuntimeError("boom")
+        field = "updated_at" if params.get("updateStatus") == "updated_at" else "inserted_at"
+        key = lambda o: unix(o[field])
+        start, end = params.get("startDateTime", 0), params.get("endDateTime", 10 ** 12)
+        selected = sorted((o for o in self.orders if start <= key(o) <= end + 0.999), key=lambda o: -key(o))
+        size, page = params["page_size"], params["page"]
+        body = {"data": selected[(page - 1) * size:page * size], "total_entries": len(selected)}
+        return Resp(json.dumps(body).encode())
+
+    def close(self):
+        pass
+
+
+@pytest.fixture
+def db(monkeypatch, tmp_path):
+    """
+    Postgres giả: số lần ghi và tao_luc mỗi đơn, id đã thấy theo run_id, checkpoint, watermark,
+    lời gọi update_is_deleted và các đơn nó đánh dấu xoá (anti-join như db.update_is_deleted).
+    """
+    state = {"rows": {}, "tao_luc": {}, "seen": {}, "cp": {}, "wm": None, "deleted": None, "is_deleted": set()}
+
+    @contextlib.contextmanager
+    def connection(name):
+        yield object()
+
+    def insert_on_conflict(conn, table, records, items, shipments, names):
+        for r in records:
+            state["rows"][r["order_id"]] = state["rows"].get(r["order_id"], 0) + 1
+            state["tao_luc"][r["order_id"]] = r["tao_luc"]
+        return len(records), 0
+
+    def mark_seen(conn, table, ids, run_id=None):
+        if run_id is not None:
+            state["seen"].setdefault(run_id, set()).update(map(str, ids))
+
+    def update_is_deleted(conn, table, run_id, seen_count, before):
+        seen = state["seen"].get(run_id, set())
+        state["deleted"] = (run_id, seen_count)
+        state["is_deleted"] = {i for i, t in state["tao_luc"].items() if t < before and i not in seen}
+
+    monkeypatch.setattr(crawler, "get_token", lambda: "t")
+    monkeypatch.setattr(run, "connection", connection)
+    for name in ("create_table", "create_child_tables", "create_state_table", "create_checkpoint_table",
+                 "create_raw_table", "archive_raw_orders", "save_sample_orders"):
+        monkeypatch.setattr(run, name, lambda *a, **k: None)
+    monkeypatch.setattr(run, "get_fingerprints", lambda *a, **k: {})
+    monkeypatch.setattr(run, "get_watermark", lambda c, t: state["wm"])
+    monkeypatch.setattr(run, "save_watermark", lambda c, t, w: state.update(wm=w))
+    monkeypatch.setattr(run, "insert_on_conflict", insert_on_conflict)
+    monkeypatch.setattr(run, "mark_seen", mark_seen)
+    monkeypatch.setattr(run, "update_is_deleted", update_is_deleted)
+    monkeypatch.setattr(cpm, "get_checkpoint", lambda c, t, k: copy.deepcopy(state["cp"].get(k)))
+    monkeypatch.setattr(cpm, "save_checkpoint", lambda c, t, k, r, s: state["cp"].__setitem__(k, (r, copy.deepcopy(s))))
+    monkeypatch.setattr(cpm, "clear_checkpoint", lambda c, t, k: state["cp"].pop(k, None))
+    monkeypatch.setattr(spool, "SPOOL_FILE", str(tmp_path / "spool.sqlite3"))
+    monkeypatch.setattr(spool, "_conn", None)
+    return state
+
+
+def history(count):
+    rng = random.Random(3)
+    return [
+        {"id": str(i), "inserted_at": iso(rng.randint(T0, T0 + 10 ** 8)), "updated_at": "2025-01-01T00:00:00", "status": 3}
+        for i in range(count)
+    ]
+
+
+def test_full_crawl_resumes_remaining_windows(db, monkeypatch):
+    api = FakePancake(history(12000))
+    monkeypatch.setattr(run, "_client", api)
+    shop = dict(SHOP, max_concurrency=2)
+
+    api.fail_after = 7
+    run.run_shop(shop)
+    run_id, state = db["cp"]["full"]
+    assert state["done"] and db["deleted"] is None and db["wm"] is None
+    written = len(db["rows"])
+
+    api.fail_after = None
+    run.run_shop(shop)
+    assert len(db["rows"]) == 12000
+    # Các cửa sổ đã xong không bị crawl lại
+    assert written == state["seen"]
+    assert all(n == 1 for n in db["rows"].values())
+    assert db["deleted"] == (run_id, 12000)
+    assert db["is_deleted"] == set()
+    assert "full" not in db["cp"]
+    assert db["wm"] is not None
+
+
+def test_resumed_full_crawl_keeps_orders_newer_than_plan_end(db, monkeypatch):
+    orders = history(12000)
+    api = FakePancake(orders)
+    monkeypatch.setattr(run, "_client", api)
+    shop = dict(SHOP, max_concurrency=2)
+
+    api.fail_after = 7
+    run.run_shop(shop)
+    run_id, state = db["cp"]["full"]
+
+    # Lượt hot/incremental ghi đơn mới tạo sau mốc end của lượt full đang dở
+    for i in range(5):
+        created = iso(state["end"] + 1 + i * 0.01)
+        orders.append({"id": f"n{i}", "inserted_at": created, "updated_at": created, "status": 0})
+        db["rows"][f"n{i}"] = 1
+        db["tao_luc"][f"n{i}"] = datetime.fromisoformat(created).replace(tzinfo=timezone.utc)
+    # Đơn cũ ở cửa sổ chưa crawl bị xoá trên Pancake trước khi lượt full chạy tiếp
+    gone = next(o for o in orders if o["id"] not in db["seen"][run_id])
+    orders.remove(gone)
+    db["rows"][gone["id"]] = 1
+    db["tao_luc"][gone["id"]] = datetime.fromisoformat(gone["inserted_at"]).replace(tzinfo=timezone.utc)
+
+    time.sleep(max(0.0, state["end"] + 1.1 - time.time()))
+    api.fail_after = None
+    run.run_shop(shop)
+    assert "full" not in db["cp"]
+    assert db["is_deleted"] == {gone["id"]}
+
+
+def test_incremental_resumes_below_last_page(db, monkeypatch):
+    now = time.time()
+    orders = [
+        {"id": str(i), "inserted_at": iso(T0), "updated_at": iso(now - 3600 + i * 0.25), "status": 3}
+        for i in range(12000)
+    ]
+    api = FakePancake(orders)
+    monkeypatch.setattr(run, "_client", api)
+    db["wm"] = datetime.fromtimestamp(now - 7200, timezone.utc).replace(tzinfo=None)
+    watermark = db["wm"]
+    shop = dict(SHOP, max_concurrency=1)
+
+    api.fail_after = 5
+    run.run_shop(shop)
+    _, state = db["cp"]["incremental"]
+    assert state["low"] is not None and db["wm"] == watermark
+
+    # Đơn đổi sau khi lượt trước bắt đầu
+    for i in range(300):
+        orders.append({"id": f"n{i}", "inserted_at": iso(T0), "updated_at": iso(time.time() + 1 + i * 0.001), "status": 0})
+    time.sleep(1.5)
+    api.fail_after = None
+    api.calls = 0
+    run.run_shop(shop)
+    assert len(db["rows"]) == 12300
+    # Chỉ các đơn quanh chỗ nối (trang cuối đã ghi) bị ghi lại, không làm lại từ đầu
+    assert sum(n > 1 for n in db["rows"].values()) < SHOP["page_size"]
+    assert "incremental" not in db["cp"]
+    assert db["wm"] > watermark
+    assert db["deleted"] is None
@@ -113,7 +113,7 @@ def detect_changes_and_overwrite(db, document_id, new_data, existing_doc):
     )
     return True
 
-def update_database():
+def update_database(json_data=None):
     client = MongoClient("mongodb://localhost:27017/", serverSelectionTimeoutMS=5000)
     db = client["quan_ly_tho"]
 
@@ -122,7 +122,8 @@ def update_database():
         logging.info("[INFO] Connected to MongoDB")
         create_indexes(db)
 
-        json_data = get_json_data()
+        if json_data is None:
+            json_data = get_json_data()
         logging.info(f"[INFO] Loaded {len(json_data)} documents from Google Sheet")
 
         col = db["chi_phi_thi_cong"]
@@ -142,6 +143,7 @@ def update_database():
                 created += 1
 
         logging.info(f"[INFO] Done. Success: {success}, Created: {created}, Updated: {updated}")
+        return created + updated
 
     except Exception as e:
         logging.error(f"[ERROR] {e}")
@@ -155,7 +157,7 @@ def main():
     update_database()
     while True:
         schedule.run_pending()
-        time.sleep(60)
+        time.sleep(1)
 
 if __name__ == "__main__":
     main()
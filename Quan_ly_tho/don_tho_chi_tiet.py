@@ -108,7 +108,7 @@ def detect_changes_and_overwrite(db, document_id: str, new_data: dict, existing_
 
 
 # ======= Update DB =======
-def update_database():
+def update_database(json_data=None):
     client = MongoClient("mongodb://localhost:27017/", serverSelectionTimeoutMS=5000)
     db = client["quan_ly_tho"]
 
@@ -117,7 +117,8 @@ def update_database():
         print("[INFO] Connected to MongoDB")
         create_indexes(db)
 
-        json_data = get_json_data()
+        if json_data is None:
+            json_data = get_json_data()
         print(f"[INFO] Loaded {len(json_data)} documents from Google Sheet")
 
         col = db["don_tho_thi_cong"]
@@ -137,6 +138,7 @@ def update_database():
             success += 1
 
         print(f"[INFO] Done. Success: {success}, Created: {created}, Updated: {updated}")
+        return created + updated
 
     except Exception as e:
         print(f"[ERROR] {e}")
@@ -153,7 +155,7 @@ def main():
     update_database()
     while True:
         schedule.run_pending()
-        time.sleep(60)
+        time.sleep(1)
 
 
 if __name__ == "__main__":